@@ -4,7 +4,9 @@ import atexit
 from flask import Flask, g, session
 from config.config import Config
 from extensions import socketio
-from models import Guest, Notification, User, init_db
+from models import Guest, User, close_db, init_db
+from models.database import close_pool
+from models.system_log import start_log_writer, stop_log_writer, write_deferred_logs
 from models.chat_message import ChatMessage
 from routes import admin_bp, api_bp, auth_bp, main_bp, staff_bp, user_bp
 from scheduled_tasks import shutdown_scheduler, start_scheduler
@@ -22,7 +24,11 @@ def create_app() -> Flask:
     # Initialize extensions
     socketio.init_app(app)
     
-    # Initialize database
+    # Initialize database; connections go back to the pool on teardown.
+    # Teardowns run in reverse order, so deferred logs are written after
+    # close_db() has released the request connection.
+    app.teardown_appcontext(write_deferred_logs)
+    app.teardown_appcontext(close_db)
     with app.app_context():
         init_db()
     
@@ -38,7 +44,11 @@ def create_app() -> Flask:
     register_hooks(app)
     
     # Start background tasks
+    start_log_writer()
     start_scheduler(app)
+    # atexit runs in reverse order: scheduler, then log flush, then pool
+    atexit.register(close_pool)
+    atexit.register(stop_log_writer)
     atexit.register(shutdown_scheduler)
     
     return app
@@ -70,8 +80,7 @@ def register_hooks(app: Flask) -> None:
         notification_count = 0
 
         if g.user and hasattr(g.user, 'id') and g.user.id:
-            unread_count = ChatMessage.get_unread_count(g.user.id)
-            notification_count = Notification.get_unread_count(g.user.id)
+            unread_count, notification_count = User.get_unread_counts(g.user.id)
 
         return {
             'current_user': g.user,
@@ -15,6 +15,30 @@ class Config:
     DATABASE_PATH: str = os.path.join(
         os.path.dirname(os.path.dirname(__file__)), 'data', 'library.db'
     )
+    DB_POOL_SIZE: int = 16  # Idle connections kept open for reuse
+    DB_BUSY_TIMEOUT_MS: int = 5000  # Wait this long for a write lock
+    DB_CACHE_SIZE_KB: int = 20000  # Page cache per connection (~20MB)
+    DB_MMAP_SIZE: int = 256 * 1024 * 1024  # Memory-mapped I/O (256MB)
+    
+    # System log writer (set LOG_WRITER_ASYNC=0 to write logs synchronously, e.g. in tests)
+    LOG_WRITER_ASYNC: bool = os.environ.get('LOG_WRITER_ASYNC', '1') != '0'
+    LOG_QUEUE_SIZE: int = 10000  # Pending entries before add() writes synchronously
+    LOG_BATCH_SIZE: int = 200  # Entries per INSERT transaction
+    LOG_FLUSH_INTERVAL_SECONDS: float = 1.0  # Max delay before a log is written
+    
+    # Home-page shelf cache (new arrivals, most borrowed, top rated)
+    SHELF_CACHE_TTL_SECONDS: int = 300  # Max staleness of a cached shelf
+    SHELF_CACHE_SIZE: int = 20  # Books precomputed per shelf
+    
+    # Users loaded by ID (other processes see changes after at most the TTL)
+    USER_CACHE_TTL_SECONDS: int = 30  # Max staleness of a cached user
+    USER_CACHE_SIZE: int = 1000  # Users kept per process
+    
+    # Dashboard totals (counts and outstanding fines)
+    STATS_CACHE_TTL_SECONDS: int = 10  # Max staleness of cached totals
+
+    # Scheduled expiry of pickups and ready reservations
+    EXPIRY_BATCH_SIZE: int = 500  # Rows expired per transaction
     
     # Upload configuration
     UPLOAD_FOLDER: str = os.path.join(
@@ -16,11 +16,11 @@ from models.borrow import Borrow
 from models.fine import Fine        # Remove Violation alias
 from models.chat_message import ChatMessage
 from models.notification import Notification
-from models.database import init_db, get_db, close_db
+from models.database import init_db, get_db, close_db, get_pool_stats
 
 __all__ = [
     'User', 'Guest', 'Staff', 'Admin', 'get_user_by_role',
     'Book', 'Review', 'Borrow', 'Fine',
     'ChatMessage', 'Notification',
-    'init_db', 'get_db', 'close_db'
+    'init_db', 'get_db', 'close_db', 'get_pool_stats'
 ]
\ No newline at end of file
@@ -1,8 +1,8 @@
 from typing import Dict, Tuple
+from models.library_stats import LibraryStats
 from models.staff import Staff
 from models.system_config import SystemConfig
 from models.system_log import SystemLog
-from models.database import get_db
 
 class Admin(Staff):
 
@@ -70,38 +70,23 @@ class Admin(Staff):
         
         Updated to be compatible with Staff Dashboard as well.
         """
-        from models.book import Book
-        from models.borrow import Borrow
-        from models.user import User
-        
-        # Calculate total debt (fines) - Logic copied from Staff model
-        db = get_db()
-        total_debt_row = db.execute(
-            'SELECT SUM(fines) as total FROM users'
-        ).fetchone()
-        total_debt = total_debt_row['total'] or 0.0
-
-        # Get core metrics
-        active_borrows = Borrow.get_active_borrows_count()
-        overdue_count = Borrow.get_overdue_count()
-        total_users = User.get_total_users()
-        total_books = Book.get_total_count()
+        totals = LibraryStats.get()
 
         stats = {
             # --- Admin Dashboard Keys ---
-            'total_books': total_books,
-            'total_users': total_users,
-            'active_borrows': active_borrows,
-            'overdue_count': overdue_count,
-            'total_staff': User.get_users_by_role('staff'),
+            'total_books': totals['total_books'],
+            'total_users': totals['total_users'],
+            'active_borrows': totals['active_borrows'],
+            'overdue_count': totals['overdue_count'],
+            'total_staff': totals['total_staff'],
             'revenue': 0,  # Placeholder
 
             # --- Staff Dashboard Compatibility Keys (Aliases) ---
             # Template staff/dashboard.html expects these specific keys:
-            'fines': total_debt,         # Fixes: 'dict object' has no attribute 'fines'
-            'borrowed': active_borrows,  # Alias for active_borrows
-            'overdue': overdue_count,    # Alias for overdue_count
-            'members': total_users,      # Alias for total_users
+            'fines': totals['total_fines'],
+            'borrowed': totals['active_borrows'],  # Alias for active_borrows
+            'overdue': totals['overdue_count'],    # Alias for overdue_count
+            'members': totals['total_users'],      # Alias for total_users
             'unread_messages': 0
         }
 
@@ -1,7 +1,151 @@
-from typing import Optional, List, Dict, Any, Tuple
+import base64
+import copy
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Any, Callable, Iterator, Tuple
+from flask import g
+from config.config import Config
+from models import database
 from models.database import get_db
 
 
+class ShelfCache:
+    """In-memory cache of the ranked home-page shelves.
+    
+    Each shelf (new arrivals, most borrowed, top rated) is stored as the
+    top ``size`` books and sliced for smaller limits. Entries expire after
+    ``ttl`` seconds and are dropped early when a change can affect them:
+    a whole shelf when its ranking column changes, or any shelf holding a
+    book whose displayed fields changed.
+    
+    Shelves are loaded outside the lock. Every invalidation bumps a
+    generation counter, and a load that started before the latest
+    invalidation is returned to its caller but not cached.
+    """
+    
+    def __init__(self, ttl: float, size: int) -> None:
+        self.ttl = ttl
+        self.size = size
+        self._lock = threading.Lock()
+        self._shelves: Dict[str, Tuple[float, List['Book']]] = {}
+        self._generation = 0
+    
+    def get(self, name: str, loader: Callable[[int], List['Book']],
+            limit: int) -> List['Book']:
+        """Get the top ``limit`` books of a shelf, loading it if needed."""
+        if limit > self.size:
+            return loader(limit)
+        
+        with self._lock:
+            entry = self._shelves.get(name)
+            generation = self._generation
+        if entry is None or entry[0] < time.monotonic():
+            books = loader(self.size)
+            entry = (time.monotonic() + self.ttl, books)
+            with self._lock:
+                if generation == self._generation:
+                    self._shelves[name] = entry
+        
+        # Copies, so callers mutating a Book cannot corrupt the cache
+        return [copy.copy(book) for book in entry[1][:limit]]
+    
+    def invalidate(self, *names: str) -> None:
+        """Drop the named shelves, or every shelf if no name is given."""
+        with self._lock:
+            self._generation += 1
+            if not names:
+                self._shelves.clear()
+            for name in names:
+                self._shelves.pop(name, None)
+    
+    def invalidate_book(self, book_id: str) -> None:
+        """Drop every shelf that currently shows the given book."""
+        with self._lock:
+            self._generation += 1
+            for name, (_, books) in list(self._shelves.items()):
+                if any(book.id == book_id for book in books):
+                    del self._shelves[name]
+
+
+class BookChanges:
+    """Unit of work for book inventory counters.
+    
+    Records per-book deltas for ``available_copies`` and ``borrow_count``
+    and applies them with one UPDATE per book, relative to the stored
+    values and clamped in SQL, so concurrent requests never overwrite each
+    other's changes. Use it through ``Book.batch_updates``.
+    """
+    
+    def __init__(self) -> None:
+        # book id -> [available delta, borrow delta, tracked Book objects]
+        self._dirty: Dict[str, list] = {}
+        self._on_commit: List[Callable[[], None]] = []
+    
+    def record(self, book: 'Book', available: int = 0, borrowed: int = 0) -> None:
+        """Record a change to a book and apply it to the object optimistically.
+        
+        Args:
+            book: The book being changed.
+            available: Change to available_copies.
+            borrowed: Change to borrow_count.
+        """
+        if not available and not borrowed:
+            return
+        entry = self._dirty.setdefault(book.id, [0, 0, []])
+        entry[0] += available
+        entry[1] += borrowed
+        if all(tracked is not book for tracked in entry[2]):
+            entry[2].append(book)
+        
+        book.available_copies = max(0, min(book.total_copies,
+                                           book.available_copies + available))
+        book.borrow_count += borrowed
+    
+    def flush(self, db) -> None:
+        """Write the recorded deltas and refresh the tracked objects.
+        
+        Does not commit; ``Book.batch_updates`` commits after flushing.
+        
+        Args:
+            db: Connection to write with.
+        """
+        for book_id, (available, borrowed, books) in self._dirty.items():
+            row = db.execute('''
+                UPDATE books
+                SET available_copies = MAX(0, MIN(total_copies, available_copies + ?)),
+                    borrow_count = borrow_count + ?
+                WHERE id = ?
+                RETURNING available_copies, borrow_count
+            ''', (available, borrowed, book_id)).fetchone()
+            if row:
+                for book in books:
+                    book.available_copies = row['available_copies']
+                    book.borrow_count = row['borrow_count']
+    
+    def on_commit(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` once the unit of work has committed.
+        
+        Callbacks are dropped if the block raises, so side effects such as
+        log entries only describe changes that were saved.
+        """
+        self._on_commit.append(callback)
+    
+    def run_commit_callbacks(self) -> None:
+        """Run the callbacks registered with on_commit, in order."""
+        for callback in self._on_commit:
+            callback()
+    
+    def invalidate_caches(self) -> None:
+        """Drop cached shelves affected by the flushed changes."""
+        for book_id, (_, borrowed, _) in self._dirty.items():
+            if borrowed:
+                shelf_cache.invalidate('most_borrowed')
+            shelf_cache.invalidate_book(book_id)
+
+
 class Book:
     """Represents a book in the library system.
     
@@ -26,6 +170,20 @@ class Book:
         borrow_count (int): Total times this book has been borrowed.
     """
     
+    # Column weights for BM25 ranking: title, author, category, publisher, description
+    SEARCH_WEIGHTS: Tuple[float, ...] = (10.0, 5.0, 2.0, 1.0, 1.0)
+    SEARCH_COLUMNS: Tuple[str, ...] = ('title', 'author', 'category')
+    # sort_by value -> (column, descending) for search ordering and paging
+    SORT_COLUMNS: Dict[str, Tuple[str, bool]] = {
+        'title': ('b.title', False),
+        'author': ('b.author', False),
+        'year': ('b.year', True),
+        'new': ('b.year', True),
+        'rating': ('b.rating', True),
+        'popular': ('b.borrow_count', True),
+        'borrow_count': ('b.borrow_count', True),
+    }
+    
     def __init__(self, id: str, title: str, author: str, category: str,
                  publisher: str, year: int, language: str, isbn: str,
                  description: str, cover_url: str, total_copies: int,
@@ -62,6 +220,32 @@ class Book:
             return Book(**dict(row))
         return None
     
+    @staticmethod
+    def get_by_ids(book_ids) -> Dict[str, 'Book']:
+        """Retrieve many books in one query per chunk of IDs.
+        
+        Args:
+            book_ids: Iterable of book IDs (duplicates are ignored).
+        
+        Returns:
+            Dictionary mapping book ID to Book for the IDs that exist.
+        """
+        db = get_db()
+        ids = list(dict.fromkeys(book_ids))
+        books = {}
+        for start in range(0, len(ids), database.MAX_SQL_PARAMS):
+            chunk = ids[start:start + database.MAX_SQL_PARAMS]
+            placeholders = ', '.join('?' for _ in chunk)
+            rows = db.execute(f'''
+                SELECT id, title, author, category, publisher, year, language, isbn,
+                       description, cover_url, total_copies, available_copies, 
+                       shelf_location, rating, borrow_count
+                FROM books WHERE id IN ({placeholders})
+            ''', chunk).fetchall()
+            for row in rows:
+                books[row['id']] = Book(**dict(row))
+        return books
+    
     @staticmethod
     def get_by_isbn(isbn: str) -> Optional['Book']:
         """Retrieve a book by its ISBN number."""
@@ -91,50 +275,184 @@ class Book:
         return [Book(**dict(row)) for row in rows]
     
     @staticmethod
-    def search(query: str = '', search_by: str = 'title',
-               sort_by: str = 'title', category: str = '') -> List['Book']:
-        """Search for books with various filters and sorting options."""
-        db = get_db()
+    def _build_match_query(query: str, search_by: str) -> str:
+        """Turn free text into an FTS5 MATCH expression.
+        
+        Every word is quoted (so user input cannot inject FTS5 syntax) and
+        matched as a prefix. Words are ANDed together and restricted to
+        the ``search_by`` column when it is one of SEARCH_COLUMNS.
+        
+        Args:
+            query: Raw search text.
+            search_by: Column to search ('title', 'author', 'category'),
+                anything else searches all indexed columns.
+        
+        Returns:
+            MATCH expression, or an empty string if the query has no words.
+        """
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return ''
         
-        sql = '''SELECT id, title, author, category, publisher, year, language, isbn,
-                        description, cover_url, total_copies, available_copies, 
-                        shelf_location, rating, borrow_count
-                 FROM books WHERE 1=1'''
+        expression = ' AND '.join(f'"{term}"*' for term in terms)
+        if search_by in Book.SEARCH_COLUMNS:
+            expression = f'{{{search_by}}} : ({expression})'
+        return expression
+    
+    @staticmethod
+    def _search_filters(query: str, search_by: str,
+                        category: str) -> Tuple[str, List[Any], bool]:
+        """Build the FROM/WHERE part shared by search() and count_search().
+        
+        Returns:
+            Tuple of (sql, params, ranked) where ranked is True when the
+            query goes through the FTS index and bm25() is available.
+        """
         params = []
+        ranked = False
         
         # Apply search filters
-        if query:
-            if search_by == 'title':
-                sql += ' AND LOWER(title) LIKE ?'
-                params.append(f'%{query.lower()}%')
-            elif search_by == 'author':
-                sql += ' AND LOWER(author) LIKE ?'
-                params.append(f'%{query.lower()}%')
-            elif search_by == 'category':
-                sql += ' AND LOWER(category) LIKE ?'
+        match = Book._build_match_query(query, search_by) if query else ''
+        if match and database.FTS_ENABLED:
+            sql = ''' FROM books b
+                     JOIN books_fts ON books_fts.rowid = b.rowid
+                     WHERE books_fts MATCH ?'''
+            params.append(match)
+            ranked = True
+        else:
+            sql = ' FROM books b WHERE 1=1'
+            if query and search_by in Book.SEARCH_COLUMNS:
+                sql += f' AND LOWER(b.{search_by}) LIKE ?'
                 params.append(f'%{query.lower()}%')
         
         # Apply category filter
         if category:
-            sql += ' AND category = ?'
+            sql += ' AND b.category = ?'
             params.append(category)
         
+        return sql, params, ranked
+    
+    @staticmethod
+    def _encode_cursor(sort_by: str, value: Any, book_id: str) -> str:
+        """Encode the last row's sort key as an opaque page cursor."""
+        raw = json.dumps([sort_by, value, book_id]).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+    
+    @staticmethod
+    def _decode_cursor(cursor: str, sort_by: str) -> Optional[Tuple[Any, str]]:
+        """Decode a page cursor; returns None if invalid or for another sort."""
+        try:
+            cursor_sort, value, book_id = json.loads(
+                base64.urlsafe_b64decode(cursor.encode('ascii'))
+            )
+        except (ValueError, TypeError):
+            return None
+        if cursor_sort != sort_by:
+            return None
+        return value, book_id
+    
+    @staticmethod
+    def search(query: str = '', search_by: str = 'title',
+               sort_by: str = 'title', category: str = '',
+               limit: Optional[int] = None,
+               cursor: Optional[str] = None) -> List['Book']:
+        """Search for books with various filters and sorting options.
+        
+        Text queries go through the ``books_fts`` full-text index with
+        prefix matching; ``sort_by='relevance'`` orders results by BM25
+        score. Falls back to LIKE matching when FTS5 is unavailable.
+        
+        Results can be paged with ``limit`` and ``cursor``; see
+        search_page(), which also returns the cursor for the next page.
+        """
+        return Book.search_page(query, search_by, sort_by, category,
+                                limit, cursor)[0]
+    
+    @staticmethod
+    def search_page(query: str = '', search_by: str = 'title',
+                    sort_by: str = 'title', category: str = '',
+                    limit: Optional[int] = None,
+                    cursor: Optional[str] = None) -> Tuple[List['Book'], Optional[str]]:
+        """Search for one page of books using keyset pagination.
+        
+        Rows are ordered by the active sort column with the book id as a
+        tie-breaker, and the cursor stores the last row's (value, id), so
+        every page is an index range scan no matter how deep it is.
+        
+        Args:
+            query: Search text.
+            search_by: Field to search (title, author, category).
+            sort_by: Sort order (relevance, title, author, year, rating,
+                popular, new).
+            category: Exact category filter.
+            limit: Page size, or None for all matching rows.
+            cursor: Cursor returned for the previous page.
+        
+        Returns:
+            Tuple of (books, next_cursor). next_cursor is None on the last page.
+        """
+        db = get_db()
+        filters, params, ranked = Book._search_filters(query, search_by, category)
+        
         # Apply sorting
-        if sort_by == 'title':
-            sql += ' ORDER BY title ASC'
-        elif sort_by == 'author':
-            sql += ' ORDER BY author ASC'
-        elif sort_by == 'year':
-            sql += ' ORDER BY year DESC'
-        elif sort_by == 'rating':
-            sql += ' ORDER BY rating DESC'
-        elif sort_by == 'popular':
-            sql += ' ORDER BY borrow_count DESC'
-        elif sort_by == 'new':
-            sql += ' ORDER BY year DESC'
+        if sort_by == 'relevance' and ranked:
+            weights = ', '.join(str(w) for w in Book.SEARCH_WEIGHTS)
+            sort_column, descending = f'bm25(books_fts, {weights})', False
+        else:
+            sort_column, descending = Book.SORT_COLUMNS.get(sort_by, ('b.title', False))
+        
+        sql = f'''SELECT b.id, b.title, b.author, b.category, b.publisher, b.year,
+                         b.language, b.isbn, b.description, b.cover_url,
+                         b.total_copies, b.available_copies, b.shelf_location,
+                         b.rating, b.borrow_count, {sort_column} AS sort_key''' + filters
+        
+        position = Book._decode_cursor(cursor, sort_by) if cursor else None
+        if position:
+            op = '<' if descending else '>'
+            sql += f''' AND ({sort_column} {op} ?
+                           OR ({sort_column} = ? AND b.id > ?))'''
+            params.extend([position[0], position[0], position[1]])
+        
+        sql += f" ORDER BY sort_key {'DESC' if descending else 'ASC'}, b.id ASC"
+        if limit:
+            # Fetch one extra row to know whether another page exists
+            sql += ' LIMIT ?'
+            params.append(int(limit) + 1)
         
         rows = db.execute(sql, params).fetchall()
-        return [Book(**dict(row)) for row in rows]
+        
+        next_cursor = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = Book._encode_cursor(sort_by, rows[-1]['sort_key'], rows[-1]['id'])
+        
+        books = []
+        for row in rows:
+            data = dict(row)
+            del data['sort_key']
+            books.append(Book(**data))
+        return books, next_cursor
+    
+    @staticmethod
+    def count_search(query: str = '', search_by: str = 'title',
+                     category: str = '', cap: int = 1000) -> Tuple[int, bool]:
+        """Count search matches, stopping after ``cap`` rows.
+        
+        Counting is bounded so a broad query never scans the whole
+        catalogue just to print a total.
+        
+        Returns:
+            Tuple of (count, is_estimate). is_estimate is True when there
+            are more than ``cap`` matches; the count is then ``cap``.
+        """
+        db = get_db()
+        filters, params, _ = Book._search_filters(query, search_by, category)
+        # One row past the cap tells an exact count of ``cap`` from more
+        row = db.execute(
+            f'SELECT COUNT(*) AS count FROM (SELECT 1{filters} LIMIT ?)',
+            params + [cap + 1]
+        ).fetchone()
+        return min(row['count'], cap), row['count'] > cap
     
     @staticmethod
     def get_by_category(category: str, limit: Optional[int] = None) -> List['Book']:
@@ -151,96 +469,122 @@ class Book:
         return [Book(**dict(row)) for row in rows]
     
     @staticmethod
-    def get_new_arrivals(limit: int = 10) -> List['Book']:
-        """Retrieve newest books sorted by publication year."""
+    def _get_ranked(order_by: str, limit: int) -> List['Book']:
+        """Query the top ``limit`` books for a shelf ordering."""
         db = get_db()
-        rows = db.execute('''
+        rows = db.execute(f'''
             SELECT id, title, author, category, publisher, year, language, isbn,
                    description, cover_url, total_copies, available_copies, 
                    shelf_location, rating, borrow_count
-            FROM books ORDER BY year DESC LIMIT ?
+            FROM books ORDER BY {order_by} LIMIT ?
         ''', (limit,)).fetchall()
         return [Book(**dict(row)) for row in rows]
     
+    @staticmethod
+    def get_new_arrivals(limit: int = 10) -> List['Book']:
+        """Retrieve newest books sorted by publication year (cached)."""
+        return shelf_cache.get(
+            'new_arrivals', lambda n: Book._get_ranked('year DESC', n), limit
+        )
+    
     @staticmethod
     def get_most_borrowed(limit: int = 10) -> List['Book']:
-        """Retrieve most popular books by borrow count."""
-        db = get_db()
-        rows = db.execute('''
-            SELECT id, title, author, category, publisher, year, language, isbn,
-                   description, cover_url, total_copies, available_copies, 
-                   shelf_location, rating, borrow_count
-            FROM books ORDER BY borrow_count DESC LIMIT ?
-        ''', (limit,)).fetchall()
-        return [Book(**dict(row)) for row in rows]
+        """Retrieve most popular books by borrow count (cached)."""
+        return shelf_cache.get(
+            'most_borrowed', lambda n: Book._get_ranked('borrow_count DESC', n), limit
+        )
     
     @staticmethod
     def get_top_rated(limit: int = 10) -> List['Book']:
-        """Retrieve highest rated books."""
-        db = get_db()
-        rows = db.execute('''
-            SELECT id, title, author, category, publisher, year, language, isbn,
-                   description, cover_url, total_copies, available_copies, 
-                   shelf_location, rating, borrow_count
-            FROM books ORDER BY rating DESC LIMIT ?
-        ''', (limit,)).fetchall()
-        return [Book(**dict(row)) for row in rows]
+        """Retrieve highest rated books (cached)."""
+        return shelf_cache.get(
+            'top_rated', lambda n: Book._get_ranked('rating DESC', n), limit
+        )
     
     @staticmethod
     def get_all_categories() -> List[str]:
         """Retrieve all unique book categories."""
+        return [facet['category'] for facet in Book.get_category_facets()]
+    
+    @staticmethod
+    def get_category_facets() -> List[Dict[str, Any]]:
+        """Retrieve per-category book counts for search facets.
+        
+        Reads the small ``category_facets`` table, which triggers on
+        ``books`` keep up to date, instead of scanning the catalogue.
+        
+        Returns:
+            List of dicts with category, book_count and available_count,
+            ordered by category.
+        """
         db = get_db()
-        rows = db.execute(
-            'SELECT DISTINCT category FROM books ORDER BY category'
-        ).fetchall()
-        return [row['category'] for row in rows]
+        rows = db.execute('''
+            SELECT category, book_count, available_count
+            FROM category_facets
+            WHERE book_count > 0
+            ORDER BY category
+        ''').fetchall()
+        return [dict(row) for row in rows]
+    
+    @staticmethod
+    @contextmanager
+    def batch_updates() -> Iterator['BookChanges']:
+        """Collect inventory changes and write them in a single commit.
+        
+        Inside the block, ``update_available_copies`` and
+        ``increment_borrow_count`` only record deltas. On a clean exit the
+        deltas are flushed and the connection is committed once, together
+        with anything else the caller wrote in the block. If the block
+        raises, the deltas are discarded and the caller is expected to roll
+        back. Nested blocks join the outermost one. Callbacks registered with
+        ``BookChanges.on_commit`` run after the commit.
+        
+        Yields:
+            The active BookChanges unit of work.
+        """
+        outer = g.get('_book_changes')
+        if outer is not None:
+            yield outer
+            return
+        
+        changes = BookChanges()
+        g._book_changes = changes
+        try:
+            yield changes
+            db = get_db()
+            changes.flush(db)
+            db.commit()
+        finally:
+            g.pop('_book_changes', None)
+        changes.invalidate_caches()
+        changes.run_commit_callbacks()
     
     def update_available_copies(self, change: int) -> None:
         """Update the available copies count.
         
         Ensures the count stays within valid bounds (0 to total_copies).
+        Commits immediately unless called inside ``Book.batch_updates``.
         
         Args:
             change: Amount to change (positive or negative).
         """
-        self.available_copies += change
-        if self.available_copies < 0:
-            self.available_copies = 0
-        if self.available_copies > self.total_copies:
-            self.available_copies = self.total_copies
-        
-        db = get_db()
-        db.execute(
-            'UPDATE books SET available_copies = ? WHERE id = ?',
-            (self.available_copies, self.id)
-        )
-        db.commit()
+        with Book.batch_updates() as changes:
+            changes.record(self, available=change)
     
     def increment_borrow_count(self) -> None:
-        """Increment the borrow count by 1."""
-        self.borrow_count += 1
-        db = get_db()
-        db.execute(
-            'UPDATE books SET borrow_count = ? WHERE id = ?',
-            (self.borrow_count, self.id)
-        )
-        db.commit()
+        """Increment the borrow count by 1.
+        
+        Commits immediately unless called inside ``Book.batch_updates``.
+        """
+        with Book.batch_updates() as changes:
+            changes.record(self, borrowed=1)
     
     def update_rating(self) -> None:
-        """Recalculate and update average rating from all reviews."""
-        db = get_db()
-        row = db.execute(
-            'SELECT AVG(rating) as avg_rating FROM reviews WHERE book_id = ?',
-            (self.id,)
-        ).fetchone()
-        
-        if row and row['avg_rating']:
-            self.rating = round(float(row['avg_rating']), 1)
-            db.execute(
-                'UPDATE books SET rating = ? WHERE id = ?',
-                (self.rating, self.id)
-            )
-            db.commit()
+        """Refresh the average rating from the book's review totals."""
+        from models.review import Review
+        rating = Review.update_book_rating(self.id)
+        if rating is not None:
+            self.rating = rating
     
     @staticmethod
     def create(title: str, author: str, category: str, publisher: str,
@@ -261,6 +605,7 @@ class Book:
             ''', (book_id, title, author, category, publisher, year, language, isbn,
                   description, cover_url, total_copies, total_copies, shelf_location))
             db.commit()
+            shelf_cache.invalidate()
             
             return Book.get_by_id(book_id)
         except Exception as e:
@@ -270,8 +615,10 @@ class Book:
     def delete(self) -> None:
         """Delete this book from the database."""
         db = get_db()
+        db.execute('DELETE FROM user_favorites WHERE book_id = ?', (self.id,))
         db.execute('DELETE FROM books WHERE id = ?', (self.id,))
         db.commit()
+        shelf_cache.invalidate()
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert book to dictionary representation."""
@@ -319,33 +666,33 @@ class Book:
         """
         db = get_db()
         
-        # ========== CRITICAL: INTERCEPT MANUAL INVENTORY UPDATE ==========
+        target_copies = None
         if 'available_copies' in kwargs:
             try:
                 target_copies = int(kwargs['available_copies'])
-                current_copies = self.available_copies
-                added_copies = target_copies - current_copies
+            except ValueError:
+                return False, "Invalid number for available copies"
+        
+        if not any(hasattr(self, key) for key in kwargs):
+            return False, "No fields to update"
+        
+        try:
+            # Promoted reservations and the book row are committed together
+            with Book.batch_updates() as changes:
+                # ========== CRITICAL: INTERCEPT MANUAL INVENTORY UPDATE ==========
+                added_copies = 0
+                if target_copies is not None:
+                    added_copies = target_copies - self.available_copies
                 
                 # Only if we are ADDING copies, we check reservations
                 if added_copies > 0:
                     from models.reservation import Reservation
                     from models.system_log import SystemLog
                     
-                    # Try to absorb these new copies into reservations
-                    copies_absorbed_by_reservations = 0
-                    
-                    for _ in range(added_copies):
-                        # Get next waiting person
-                        next_res = Reservation.get_next_in_queue(self.id)
-                        
-                        if next_res:
-                            # Assign copy to this person (Hidden Inventory)
-                            success, _ = next_res.mark_ready(hold_hours=48)
-                            if success:
-                                copies_absorbed_by_reservations += 1
-                        else:
-                            # No more reservations waiting
-                            break
+                    # Absorb the new copies into waiting reservations in one pass
+                    copies_absorbed_by_reservations = Reservation.promote_waiting(
+                        self.id, added_copies, hold_hours=48
+                    )
                     
                     if copies_absorbed_by_reservations > 0:
                         # Logic:
@@ -356,37 +703,39 @@ class Book:
                         
                         kwargs['available_copies'] = target_copies - copies_absorbed_by_reservations
                         
-                        # Log this automatic action
-                        SystemLog.add(
-                            'Inventory Update Intercepted',
+                        # Log this automatic action once it is saved
+                        message = (
                             f'Admin added {added_copies} copies. System automatically assigned '
                             f'{copies_absorbed_by_reservations} copies to waiting reservations. '
-                            f'Public inventory set to {kwargs["available_copies"]}.',
+                            f'Public inventory set to {kwargs["available_copies"]}.'
+                        )
+                        changes.on_commit(lambda: SystemLog.add(
+                            'Inventory Update Intercepted',
+                            message,
                             'system',
                             None # Or current user ID if available in context
-                        )
-            except ValueError:
-                return False, "Invalid number for available copies"
-
-        # ========== STANDARD UPDATE LOGIC ==========
-        fields = []
-        values = []
-        
-        for key, value in kwargs.items():
-            if hasattr(self, key):
-                fields.append(f"{key} = ?")
-                values.append(value)
-                setattr(self, key, value)
-        
-        if not fields:
-            return False, "No fields to update"
-        
-        values.append(self.id)
-        query = f"UPDATE books SET {', '.join(fields)} WHERE id = ?"
-        
-        try:
-            db.execute(query, values)
-            db.commit()
+                        ))
+                
+                # ========== STANDARD UPDATE LOGIC ==========
+                fields = []
+                values = []
+                
+                for key, value in kwargs.items():
+                    if hasattr(self, key):
+                        fields.append(f"{key} = ?")
+                        values.append(value)
+                        setattr(self, key, value)
+                
+                values.append(self.id)
+                query = f"UPDATE books SET {', '.join(fields)} WHERE id = ?"
+                db.execute(query, values)
+            
+            shelf_cache.invalidate()
             return True, "Book updated successfully"
         except Exception as e:
-            return False, f"Failed to update book: {e}"
\ No newline at end of file
+            db.rollback()
+            return False, f"Failed to update book: {e}"
+
+
+# Shared by all requests in this process
+shelf_cache = ShelfCache(Config.SHELF_CACHE_TTL_SECONDS, Config.SHELF_CACHE_SIZE)
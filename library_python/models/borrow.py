@@ -1,28 +1,19 @@
+from collections import defaultdict
 from datetime import datetime, timedelta
+import logging
+import time
 from typing import Optional, Tuple
 import uuid
 from config.config import Config
 from models.book import Book
-from models.database import get_db
+from models.database import get_db, like_contains
 from models.system_config import SystemConfig
 
+logger = logging.getLogger(__name__)
+
+
 class Borrow:
     
-    @staticmethod
-    def get_expired_pickups_details(hours=48):
-        """Get details of expired pending pickups for notification."""
-        db = get_db()
-        hold_days = SystemConfig.get_int('reservation_hold_time', 2)
-        hold_hours = hold_days * 24
-        
-        limit_time = (datetime.now() - timedelta(hours=hold_hours)).strftime('%Y-%m-%d %H:%M:%S')
-        return db.execute('''
-            SELECT b.user_id, bk.title 
-            FROM borrows b
-            JOIN books bk ON b.book_id = bk.id
-            WHERE b.status = 'pending_pickup' AND b.borrow_date <= ?
-        ''', (limit_time,)).fetchall()
-
     def __init__(self, id, user_id, book_id, borrow_date, due_date, return_date,
                  status, renewed_count, pending_until=None, condition=None, 
                  damage_fee=0.0, late_fee=0.0):
@@ -38,6 +29,9 @@ class Borrow:
         self.condition = condition
         self.damage_fee = float(damage_fee) if damage_fee else 0.0
         self.late_fee = float(late_fee) if late_fee else 0.0
+        # Related rows filled by get_book()/get_user() or Borrow.prefetch()
+        self._related = {}
+        self._parsed_due = (None, None)
     
     @property
     def is_pending(self) -> bool:
@@ -97,108 +91,179 @@ class Borrow:
             return 0.0
 
     @staticmethod
-    def create(user_id, book_id):
-        from models.reservation import Reservation
+    def _borrow_context(db, user_id, book_id):
+        """Read the user-side facts Borrow.create validates in one query.
         
-        db = get_db()
+        Returns:
+            Row with user_name, user_fines (NULL if the user is missing),
+            active_count, has_active (same book already borrowed or pending)
+            and the user's latest reservation for the book as
+            reservation_id/reservation_status/reservation_hold_until.
+        """
+        return db.execute('''
+            SELECT u.name AS user_name, u.fines AS user_fines,
+                   (SELECT COUNT(*) FROM borrows
+                    WHERE user_id = :user_id
+                      AND status IN ('borrowed', 'pending_pickup')) AS active_count,
+                   EXISTS (SELECT 1 FROM borrows
+                           WHERE user_id = :user_id AND book_id = :book_id
+                             AND status IN ('borrowed', 'pending_pickup')) AS has_active,
+                   r.id AS reservation_id, r.status AS reservation_status,
+                   r.hold_until AS reservation_hold_until
+            FROM (SELECT 1)
+            LEFT JOIN users u ON u.id = :user_id
+            LEFT JOIN reservations r ON r.id = (
+                SELECT id FROM reservations
+                WHERE user_id = :user_id AND book_id = :book_id
+                ORDER BY reservation_date DESC
+                LIMIT 1
+            )
+        ''', {'user_id': user_id, 'book_id': book_id}).fetchone()
+
+    @staticmethod
+    def create(user_id, book_id):
+        """Create a pending-pickup borrow.
         
-        # ========== VALIDATION 1: Check book existence ==========
-        book = Book.get_by_id(book_id)
-        if not book:
-            return None, "Book not found"
+        Validation and writes run in one BEGIN IMMEDIATE transaction, so
+        two requests cannot both pass the limit or availability checks, and
+        the whole borrow is committed once. Must not be called with a
+        transaction open on the request connection; such calls fail
+        without touching the caller's writes. Phase timings are logged at
+        DEBUG level.
+        """
+        from models.reservation import Reservation
+        from models.system_log import SystemLog
         
-        # ========== VALIDATION 2: Check user borrow limit ==========
-        active_borrows = Borrow.get_active_borrows(user_id)
+        timings = {}
+        started = phase = time.perf_counter()
         
-        # [DYNAMIC] Get Max Limit from DB
+        # [DYNAMIC] Limits and durations from DB (cached per config version)
         max_limit = SystemConfig.get_int('max_borrowed_books', Config.MAX_BORROW_LIMIT)
+        hold_days = SystemConfig.get_int('reservation_hold_time', 2)
+        borrow_days = SystemConfig.get_int('borrow_duration', Config.BORROW_DURATION_DAYS)
         
-        if len(active_borrows) >= max_limit:
-            return None, f"You have reached the maximum borrow limit of {max_limit} books"
+        db = get_db()
+        if db.in_transaction:
+            # Committing here would save the caller's pending writes with
+            # the borrow, and rolling back would discard them; refuse instead
+            logger.error('Borrow.create() called inside an open transaction')
+            return None, "Failed to create borrow request: another change is still in progress"
+        db.execute('BEGIN IMMEDIATE')
+        timings['lock'] = time.perf_counter() - phase
+        phase = time.perf_counter()
         
-        # ========== VALIDATION 3: Check duplicate requests ==========
-        for borrow in active_borrows:
-            if borrow.book_id == book_id:
+        try:
+            book = Book.get_by_id(book_id)
+            context = Borrow._borrow_context(db, user_id, book_id)
+            timings['validate'] = time.perf_counter() - phase
+            phase = time.perf_counter()
+            
+            # ========== VALIDATION 1: Check book existence ==========
+            if not book:
+                db.rollback()
+                return None, "Book not found"
+            
+            # ========== VALIDATION 2: Check user borrow limit ==========
+            if context['active_count'] >= max_limit:
+                db.rollback()
+                return None, f"You have reached the maximum borrow limit of {max_limit} books"
+            
+            # ========== VALIDATION 3: Check duplicate requests ==========
+            if context['has_active']:
+                db.rollback()
                 return None, "You have already borrowed or requested this book"
-        
-        # ========== VALIDATION 4: Check for unpaid fines ==========
-        from models.user import User
-        user = User.get_by_id(user_id)
-        if user and user.fines > 0:
-            return None, f"Please pay your outstanding fine of {user.fines:,.0f} VND before borrowing"
-        
-        # ========== CRITICAL: HIDDEN INVENTORY CHECK ==========
-        user_reservation = Reservation.get_user_book_reservation(user_id, book_id)
-        has_priority_access = False
-        
-        if user_reservation and user_reservation.status == 'ready':
-            if user_reservation.hold_until:
+            
+            # ========== VALIDATION 4: Check for unpaid fines ==========
+            user_name = context['user_name']
+            if user_name is not None and context['user_fines'] > 0:
+                db.rollback()
+                return None, f"Please pay your outstanding fine of {context['user_fines']:,.0f} VND before borrowing"
+            
+            # ========== CRITICAL: HIDDEN INVENTORY CHECK ==========
+            has_priority_access = False
+            if context['reservation_status'] == 'ready' and context['reservation_hold_until']:
                 hold_deadline = datetime.strptime(
-                    user_reservation.hold_until, '%Y-%m-%d %H:%M:%S'
+                    context['reservation_hold_until'], '%Y-%m-%d %H:%M:%S'
                 )
                 if datetime.now() <= hold_deadline:
                     has_priority_access = True
                 else:
-                    user_reservation.cancel()
+                    db.rollback()
+                    expired = Reservation.get_by_id(context['reservation_id'])
+                    if expired:
+                        expired.cancel()
                     return None, "Your reservation has expired. Please reserve again."
-        
-        # ========== INVENTORY AVAILABILITY CHECK ==========
-        if not has_priority_access:
-            if book.available_copies <= 0:
-                return None, "Book is not available. Please reserve it instead."
-        
-        # ========== CREATE BORROW RECORD ==========
-        borrow_id = str(uuid.uuid4())
-        now = datetime.now()
-        borrow_date = now.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # [DYNAMIC] Get durations from DB
-        hold_days = SystemConfig.get_int('reservation_hold_time', 2)
-        borrow_days = SystemConfig.get_int('borrow_duration', Config.BORROW_DURATION_DAYS)
-        
-        pending_until = (now + timedelta(days=hold_days)).strftime('%Y-%m-%d %H:%M:%S')
-        estimated_due_date = (now + timedelta(days=borrow_days)).strftime('%Y-%m-%d %H:%M:%S')
-        
-        try:
-            db.execute('''
-                INSERT INTO borrows (id, user_id, book_id, borrow_date, due_date, 
-                                   return_date, status, renewed_count, pending_until,
-                                   condition, damage_fee, late_fee)
-                VALUES (?, ?, ?, ?, ?, NULL, 'pending_pickup', 0, ?, NULL, 0, 0)
-            ''', (borrow_id, user_id, book_id, borrow_date, estimated_due_date, pending_until))
             
-            # ========== CRITICAL: INVENTORY MANAGEMENT ==========
-            if has_priority_access:
-                user_reservation.complete()
-                from models.system_log import SystemLog
-                SystemLog.add(
-                    'Priority Borrow Created',
-                    f'{user.name} claimed reserved book "{book.title}" from hidden inventory',
-                    'info',
-                    user_id
-                )
-            else:
-                book.update_available_copies(-1)
-                
-            book.increment_borrow_count()
-            db.commit()
+            # ========== INVENTORY AVAILABILITY CHECK ==========
+            if not has_priority_access and book.available_copies <= 0:
+                db.rollback()
+                return None, "Book is not available. Please reserve it instead."
             
-            # Log the action
-            from models.system_log import SystemLog
-            if user:
-                SystemLog.add(
-                    'Book Hold Created',
-                    f'{user.name} created pending pickup for "{book.title}" (Must pickup by {pending_until})',
-                    'info',
-                    user_id
-                )
+            # ========== CREATE BORROW RECORD ==========
+            now = datetime.now()
+            borrow = Borrow(
+                id=str(uuid.uuid4()),
+                user_id=user_id,
+                book_id=book_id,
+                borrow_date=now.strftime('%Y-%m-%d %H:%M:%S'),
+                due_date=(now + timedelta(days=borrow_days)).strftime('%Y-%m-%d %H:%M:%S'),
+                return_date=None,
+                status='pending_pickup',
+                renewed_count=0,
+                pending_until=(now + timedelta(days=hold_days)).strftime('%Y-%m-%d %H:%M:%S'),
+            )
             
-            return Borrow.get_by_id(borrow_id), f"Book reserved! Please pick it up within {hold_days * 24} hours (by {pending_until})"
+            with Book.batch_updates():
+                db.execute('''
+                    INSERT INTO borrows (id, user_id, book_id, borrow_date, due_date, 
+                                       return_date, status, renewed_count, pending_until,
+                                       condition, damage_fee, late_fee)
+                    VALUES (?, ?, ?, ?, ?, NULL, 'pending_pickup', 0, ?, NULL, 0, 0)
+                ''', (borrow.id, user_id, book_id, borrow.borrow_date,
+                      borrow.due_date, borrow.pending_until))
+                
+                # ========== CRITICAL: INVENTORY MANAGEMENT ==========
+                if has_priority_access:
+                    # Claiming the held copy; inventory stays in the hidden pool
+                    db.execute(
+                        "UPDATE reservations SET status = 'completed' WHERE id = ?",
+                        (context['reservation_id'],)
+                    )
+                else:
+                    book.update_available_copies(-1)
+                    
+                book.increment_borrow_count()
+                timings['write'] = time.perf_counter() - phase
+                phase = time.perf_counter()
+            timings['commit'] = time.perf_counter() - phase
             
         except Exception as e:
             db.rollback()
             print(f"Error creating borrow: {e}")
             return None, f"Failed to create borrow request: {str(e)}"
+        
+        # Log the action
+        if has_priority_access:
+            SystemLog.add(
+                'Priority Borrow Created',
+                f'{user_name} claimed reserved book "{book.title}" from hidden inventory',
+                'info',
+                user_id
+            )
+        if user_name is not None:
+            SystemLog.add(
+                'Book Hold Created',
+                f'{user_name} created pending pickup for "{book.title}" (Must pickup by {borrow.pending_until})',
+                'info',
+                user_id
+            )
+        
+        timings['total'] = time.perf_counter() - started
+        logger.debug('Borrow %s timings: %s', borrow.id, ', '.join(
+            f'{name}={seconds * 1000:.1f}ms' for name, seconds in timings.items()
+        ))
+        
+        return borrow, f"Book reserved! Please pick it up within {hold_days * 24} hours (by {borrow.pending_until})"
 
     def return_book(self, condition='good', book_value=0.0) -> Tuple[bool, str]:
         """Return borrowed book with HIDDEN INVENTORY support."""
@@ -236,52 +301,43 @@ class Borrow:
             db.rollback()
             return False, "Book not found"
 
-        # Check for active reservations
-        if Reservation.has_active_reservations(self.book_id):
-            # Book goes to HIDDEN POOL
-            next_reservation = Reservation.get_next_in_queue(self.book_id)
-            
-            # [DYNAMIC] Get Hold Time
-            hold_days = SystemConfig.get_int('reservation_hold_time', 2)
-            
-            if next_reservation:
-                success, msg = next_reservation.mark_ready(hold_hours=hold_days * 24)
+        # The borrow update, inventory changes and fines are committed
+        # together on exit; nothing inside the block commits
+        try:
+            with Book.batch_updates() as changes:
+                # [DYNAMIC] Get Hold Time
+                hold_days = SystemConfig.get_int('reservation_hold_time', 2)
                 
-                if success:
-                    SystemLog.add(
+                # Next in queue gets the copy (HIDDEN POOL), otherwise it goes public
+                if Reservation.release_copies(book, 1, hold_hours=hold_days * 24):
+                    changes.on_commit(lambda: SystemLog.add(
                         'Book to Hidden Pool',
                         f'"{book.title}" returned to hidden pool. Next in queue notified.',
                         'info',
                         self.user_id
-                    )
+                    ))
                 else:
-                    book.update_available_copies(1)
-                    SystemLog.add(
-                        'Reservation Notification Failed',
-                        f'Failed to notify. Book returned to public pool. Error: {msg}',
-                        'warning',
+                    changes.on_commit(lambda: SystemLog.add(
+                        'Book to Public Pool',
+                        f'"{book.title}" returned to public inventory.',
+                        'info',
                         self.user_id
-                    )
-        else:
-            book.update_available_copies(1)
-            SystemLog.add(
-                'Book to Public Pool',
-                f'"{book.title}" returned to public inventory.',
-                'info',
-                self.user_id
-            )
-
-        # Apply fines
-        total_fine = self.late_fee + self.damage_fee
-        if total_fine > 0:
-            user = User.get_by_id(self.user_id)
-            if user:
-                user.add_fine(total_fine)
-                user.add_violation()
-                fine_reason = f"Return fees (Late: {self.late_fee:,.0f}, Damage: {self.damage_fee:,.0f})"
-                Fine.create(self.user_id, total_fine, fine_reason, self.id)
-
-        db.commit()
+                    ))
+
+                # Apply fines
+                total_fine = self.late_fee + self.damage_fee
+                if total_fine > 0:
+                    user = User.get_by_id(self.user_id)
+                    if user:
+                        user.add_fine(total_fine, commit=False)
+                        user.add_violation(commit=False)
+                        fine_reason = f"Return fees (Late: {self.late_fee:,.0f}, Damage: {self.damage_fee:,.0f})"
+                        Fine.create(self.user_id, total_fine, fine_reason, self.id, commit=False)
+                        changes.on_commit(lambda: User.invalidate_cache(self.user_id))
+        except Exception as e:
+            db.rollback()
+            self.status = 'borrowed'
+            return False, f"Failed to return book: {str(e)}"
 
         # Log return
         user = User.get_by_id(self.user_id)
@@ -356,43 +412,75 @@ class Borrow:
             db.rollback()
             return False, "Book not found"
 
-        next_reservation = Reservation.get_next_in_queue(self.book_id)
-        
-        if next_reservation:
-
+        with Book.batch_updates() as changes:
             hold_days = SystemConfig.get_int('reservation_hold_time', 2)
-            success, msg = next_reservation.mark_ready(hold_hours=hold_days * 24)
-            
-            if success:
-                SystemLog.add('Borrow Cancelled - Cascaded', f'Book passed to next reserver.', 'info', self.user_id)
+            if Reservation.release_copies(book, 1, hold_hours=hold_days * 24):
+                changes.on_commit(lambda: SystemLog.add(
+                    'Borrow Cancelled - Cascaded', f'Book passed to next reserver.', 'info', self.user_id
+                ))
             else:
-                book.update_available_copies(1)
-        else:
-            book.update_available_copies(1)
-            SystemLog.add('Borrow Cancelled', f'Book returned to public.', 'info', self.user_id)
+                changes.on_commit(lambda: SystemLog.add(
+                    'Borrow Cancelled', f'Book returned to public.', 'info', self.user_id
+                ))
 
-        db.commit()
         return True, "Borrow request cancelled successfully"
 
     @staticmethod
-    def auto_cancel_expired_pickups():
+    def auto_cancel_expired_pickups() -> int:
+        """Cancel every pending pickup whose deadline has passed.
+        
+        Works in chunks of Config.EXPIRY_BATCH_SIZE. Each chunk is one
+        UPDATE ... RETURNING; the freed copies are handed back per book
+        (waiting reservations first) and the borrowers are notified in bulk,
+        all in one commit.
+        
+        Returns:
+            Number of pickups cancelled.
+        """
+        from models.notification import Notification
+        from models.reservation import Reservation
+        
         db = get_db()
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        expired_rows = db.execute('''
-            SELECT id FROM borrows
-            WHERE status = 'pending_pickup' AND pending_until < ?
-        ''', (now,)).fetchall()
+        hold_days = SystemConfig.get_int('reservation_hold_time', 2)
+        batch_size = Config.EXPIRY_BATCH_SIZE
         
         cancelled_count = 0
-        for row in expired_rows:
-            borrow = Borrow.get_by_id(row['id'])
-            if borrow:
-                success, _ = borrow.cancel()
-                if success:
-                    cancelled_count += 1
-        
-        return cancelled_count
+        while True:
+            with Book.batch_updates():
+                rows = db.execute('''
+                    UPDATE borrows SET status = 'cancelled'
+                    WHERE id IN (
+                        SELECT id FROM borrows
+                        WHERE status = 'pending_pickup' AND pending_until < ?
+                        LIMIT ?
+                    )
+                    RETURNING user_id, book_id
+                ''', (now, batch_size)).fetchall()
+                
+                borrowers = defaultdict(list)
+                for row in rows:
+                    borrowers[row['book_id']].append(row['user_id'])
+                
+                books = Book.get_by_ids(borrowers)
+                for book_id, user_ids in borrowers.items():
+                    book = books.get(book_id)
+                    if not book:
+                        continue
+                    Reservation.release_copies(book, len(user_ids), hold_hours=hold_days * 24)
+                    Notification.bulk_create(
+                        user_ids,
+                        'alert',
+                        'Reservation Cancelled - Pickup Expired',
+                        f'Your reservation for "{book.title}" has been automatically cancelled '
+                        f'because it was not picked up within {Config.PENDING_PICKUP_HOURS} hours. '
+                        f'You can reserve it again if needed.',
+                        commit=False
+                    )
+            
+            cancelled_count += len(rows)
+            if len(rows) < batch_size:
+                return cancelled_count
 
     @staticmethod
     def get_user_reserved_books(user_id: str) -> list:
@@ -413,38 +501,89 @@ class Borrow:
         pending = Borrow.get_user_borrows(user_id, status='pending_pickup')
         return borrowed + pending
 
+    @staticmethod
+    def prefetch(borrows, users: bool = True) -> list:
+        """Load the books (and users) of many borrows in bulk.
+        
+        Afterwards get_book()/get_user() on these borrows are served from
+        memory, so rendering a list costs one query per table instead of
+        one per row.
+        
+        Args:
+            borrows: List of Borrow objects.
+            users: Whether to load users as well as books.
+        
+        Returns:
+            The same list, for chaining.
+        """
+        books = Book.get_by_ids(b.book_id for b in borrows if 'book' not in b._related)
+        for borrow in borrows:
+            borrow._related.setdefault('book', books.get(borrow.book_id))
+        
+        if users:
+            from models.user import User
+            user_map = User.get_by_ids(b.user_id for b in borrows if 'user' not in b._related)
+            for borrow in borrows:
+                borrow._related.setdefault('user', user_map.get(borrow.user_id))
+        return borrows
+    
+    @staticmethod
+    def to_dicts(borrows) -> list:
+        """Serialise many borrows with a constant number of queries.
+        
+        Books are loaded in one batch, the late-fee rate is read once and
+        the clock is sampled once for the whole list.
+        """
+        Borrow.prefetch(borrows, users=False)
+        daily_rate = SystemConfig.get_float('late_fee_per_day', Config.LATE_FEE_DAILY)
+        now = datetime.now()
+        return [borrow.to_dict(daily_rate=daily_rate, now=now) for borrow in borrows]
+    
     def get_book(self):
-        return Book.get_by_id(self.book_id)
+        if 'book' not in self._related:
+            self._related['book'] = Book.get_by_id(self.book_id)
+        return self._related['book']
+    
+    def _due_datetime(self) -> datetime:
+        """Parse due_date once; re-parses only if due_date has changed."""
+        raw, parsed = self._parsed_due
+        if raw != self.due_date:
+            try:
+                parsed = datetime.strptime(self.due_date, '%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                parsed = datetime.strptime(self.due_date, '%Y-%m-%d')
+            self._parsed_due = (self.due_date, parsed)
+        return parsed
     
-    def is_overdue(self):
+    def is_overdue(self, now=None):
         if self.status != 'borrowed':
             return False
-        try:
-            due_date = datetime.strptime(self.due_date, '%Y-%m-%d %H:%M:%S')
-        except ValueError:
-            due_date = datetime.strptime(self.due_date, '%Y-%m-%d')
-        return datetime.now() > due_date
+        return (now or datetime.now()) > self._due_datetime()
     
-    def get_overdue_days(self):
-        if not self.is_overdue():
+    def get_overdue_days(self, now=None):
+        now = now or datetime.now()
+        if not self.is_overdue(now):
             return 0
-        try:
-            due_date = datetime.strptime(self.due_date, '%Y-%m-%d %H:%M:%S')
-        except ValueError:
-            due_date = datetime.strptime(self.due_date, '%Y-%m-%d')
-        return (datetime.now() - due_date).days
+        return (now - self._due_datetime()).days
     
-    def get_fine_amount(self):
-        overdue_days = self.get_overdue_days()
-        daily_rate = SystemConfig.get_float('late_fee_per_day', Config.LATE_FEE_DAILY)
+    def get_fine_amount(self, daily_rate=None, now=None):
+        overdue_days = self.get_overdue_days(now)
+        if daily_rate is None:
+            daily_rate = SystemConfig.get_float('late_fee_per_day', Config.LATE_FEE_DAILY)
         return overdue_days * daily_rate
     
     def get_user(self):
-        from models.user import User
-        return User.get_by_id(self.user_id)
+        if 'user' not in self._related:
+            from models.user import User
+            self._related['user'] = User.get_by_id(self.user_id)
+        return self._related['user']
     
-    def to_dict(self):
+    def to_dict(self, daily_rate=None, now=None):
+        now = now or datetime.now()
         book = self.get_book()
+        overdue_days = self.get_overdue_days(now)
+        if daily_rate is None:
+            daily_rate = SystemConfig.get_float('late_fee_per_day', Config.LATE_FEE_DAILY)
         return {
             'id': self.id,
             'user_id': self.user_id,
@@ -452,12 +591,13 @@ class Borrow:
             'book': book.to_dict() if book else None,
             'borrow_date': self.borrow_date,
             'due_date': self.due_date,
+            'pending_until': self.pending_until,
             'return_date': self.return_date,
             'status': self.status,
             'renewed_count': self.renewed_count,
-            'is_overdue': self.is_overdue(),
-            'overdue_days': self.get_overdue_days(),
-            'fine_amount': self.get_fine_amount()
+            'is_overdue': self.is_overdue(now),
+            'overdue_days': overdue_days,
+            'fine_amount': overdue_days * daily_rate
         }
 
     @staticmethod
@@ -536,7 +676,54 @@ class Borrow:
             (status,)
         ).fetchall()
         return [Borrow(**dict(row)) for row in rows]
-    
+
+    # Sort orders offered by the staff dashboard panels
+    STAFF_PAGE_SORTS = {
+        'newest': 'b.borrow_date DESC',
+        'oldest': 'b.borrow_date ASC',
+        'due': 'b.due_date ASC',
+        'pickup': 'b.pending_until ASC',
+        'user': 'u.name COLLATE NOCASE ASC',
+    }
+
+    @staticmethod
+    def get_staff_page(status, query='', sort='newest', page=1,
+                       per_page=20) -> Tuple[list, bool]:
+        """Get one page of borrows for a staff dashboard panel.
+
+        Filtering by user name and sorting happen in SQL, and one extra
+        row is fetched to tell whether another page follows, so a panel
+        never loads more than ``per_page`` borrows.
+
+        Args:
+            status: 'pending_pickup', 'borrowed', or 'overdue' for borrowed
+                books past their due date.
+            query: Case-insensitive substring of the user's name.
+            sort: Key of STAFF_PAGE_SORTS.
+            page: 1-based page number.
+            per_page: Page size.
+
+        Returns:
+            Tuple of (borrows, has_more).
+        """
+        db = get_db()
+        sql = 'SELECT b.* FROM borrows b JOIN users u ON u.id = b.user_id WHERE b.status = ?'
+        params = ['borrowed' if status == 'overdue' else status]
+        if status == 'overdue':
+            sql += ' AND b.due_date < ?'
+            params.append(datetime.now().strftime('%Y-%m-%d'))
+        if query:
+            sql += " AND LOWER(u.name) LIKE ? ESCAPE '\\'"
+            params.append(like_contains(query.lower()))
+
+        order_by = Borrow.STAFF_PAGE_SORTS.get(sort, Borrow.STAFF_PAGE_SORTS['newest'])
+        sql += f' ORDER BY {order_by}, b.id LIMIT ? OFFSET ?'
+        params.extend([per_page + 1, (max(page, 1) - 1) * per_page])
+
+        rows = db.execute(sql, params).fetchall()
+        borrows = [Borrow(**dict(row)) for row in rows[:per_page]]
+        return borrows, len(rows) > per_page
+
     @staticmethod
     def get_all():
         db = get_db()
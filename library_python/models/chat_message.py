@@ -35,10 +35,33 @@ class ChatMessage:
             INSERT INTO chat_messages (id, sender_id, receiver_id, message, timestamp, is_read)
             VALUES (?, ?, ?, ?, ?, 0)
         ''', (message_id, sender_id, receiver_id, message, timestamp))
+        ChatMessage._touch_conversations(db, sender_id, receiver_id, message, timestamp)
         db.commit()
 
         return ChatMessage.get_by_id(message_id)
 
+    @staticmethod
+    def _touch_conversations(db, sender_id: str, receiver_id: str,
+                             message: str, timestamp: str) -> None:
+        """Update both participants' conversation summaries for a new message.
+
+        Runs in the caller's transaction so summaries never drift from
+        chat_messages.
+        """
+        db.execute('''
+            INSERT INTO conversations (user_id, partner_id, last_message, last_time, unread_count)
+            VALUES (?, ?, ?, ?, 0)
+            ON CONFLICT (user_id, partner_id) DO UPDATE
+            SET last_message = excluded.last_message, last_time = excluded.last_time
+        ''', (sender_id, receiver_id, message, timestamp))
+        db.execute('''
+            INSERT INTO conversations (user_id, partner_id, last_message, last_time, unread_count)
+            VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT (user_id, partner_id) DO UPDATE
+            SET last_message = excluded.last_message, last_time = excluded.last_time,
+                unread_count = unread_count + 1
+        ''', (receiver_id, sender_id, message, timestamp))
+
     @staticmethod
     def get_by_id(message_id: str) -> Optional['ChatMessage']:
         """Get message by ID."""
@@ -69,13 +92,13 @@ class ChatMessage:
 
     @staticmethod
     def get_unread_count(user_id: str) -> int:
-        """Get count of unread messages for a user."""
+        """Get count of unread messages for a user (from user_counters)."""
         db = get_db()
-        row = db.execute('''
-            SELECT COUNT(*) as count FROM chat_messages 
-            WHERE receiver_id = ? AND is_read = 0
-        ''', (user_id,)).fetchone()
-        return row['count']
+        row = db.execute(
+            'SELECT unread_messages FROM user_counters WHERE user_id = ?',
+            (user_id,)
+        ).fetchone()
+        return row['unread_messages'] if row else 0
 
     @staticmethod
     def mark_as_read(user_id: str, sender_id: str) -> None:
@@ -84,52 +107,31 @@ class ChatMessage:
         db.execute('''
             UPDATE chat_messages 
             SET is_read = 1 
-            WHERE receiver_id = ? AND sender_id = ?
+            WHERE receiver_id = ? AND sender_id = ? AND is_read = 0
+        ''', (user_id, sender_id))
+        db.execute('''
+            UPDATE conversations SET unread_count = 0
+            WHERE user_id = ? AND partner_id = ?
         ''', (user_id, sender_id))
         db.commit()
 
     @staticmethod
     def get_recent_conversations(user_id: str) -> List[dict]:
-        """Get list of recent conversations for a user."""
+        """Get list of recent conversations for a user.
+
+        Reads the maintained ``conversations`` summary table, so the cost
+        is one index range scan regardless of message history.
+        """
         db = get_db()
 
         rows = db.execute('''
-            SELECT DISTINCT 
-                CASE 
-                    WHEN sender_id = ? THEN receiver_id
-                    ELSE sender_id
-                END as partner_id,
-                MAX(timestamp) as last_message_time
-            FROM chat_messages
-            WHERE sender_id = ? OR receiver_id = ?
-            GROUP BY partner_id
-            ORDER BY last_message_time DESC
-        ''', (user_id, user_id, user_id)).fetchall()
-
-        conversations = []
-        for row in rows:
-            partner_id = row['partner_id']
-            last_msg = db.execute('''
-                SELECT * FROM chat_messages
-                WHERE (sender_id = ? AND receiver_id = ?) 
-                   OR (sender_id = ? AND receiver_id = ?)
-                ORDER BY timestamp DESC
-                LIMIT 1
-            ''', (user_id, partner_id, partner_id, user_id)).fetchone()
-
-            unread = db.execute('''
-                SELECT COUNT(*) as count FROM chat_messages
-                WHERE sender_id = ? AND receiver_id = ? AND is_read = 0
-            ''', (partner_id, user_id)).fetchone()
-
-            conversations.append({
-                'partner_id': partner_id,
-                'last_message': last_msg['message'] if last_msg else '',
-                'last_time': last_msg['timestamp'] if last_msg else '',
-                'unread_count': unread['count']
-            })
+            SELECT partner_id, last_message, last_time, unread_count
+            FROM conversations
+            WHERE user_id = ?
+            ORDER BY last_time DESC
+        ''', (user_id,)).fetchall()
 
-        return conversations
+        return [dict(row) for row in rows]
 
     def to_dict(self) -> dict:
         return {
@@ -211,17 +213,32 @@ class ChatMessage:
 
     @staticmethod
     def get_recent_conversations_with_details(user_id: str) -> List[dict]:
-        """Get recent conversations with user details."""
-        from models.user import User
+        """Get recent conversations with partner details in a single query."""
+        db = get_db()
 
-        conversations = ChatMessage.get_recent_conversations(user_id)
+        rows = db.execute('''
+            SELECT c.partner_id, c.last_message, c.last_time, c.unread_count,
+                   u.id AS partner_exists, u.name AS partner_name,
+                   u.email AS partner_email, u.role AS partner_role
+            FROM conversations c
+            LEFT JOIN users u ON u.id = c.partner_id
+            WHERE c.user_id = ?
+            ORDER BY c.last_time DESC
+        ''', (user_id,)).fetchall()
 
-        for conv in conversations:
-            partner = User.get_by_id(conv['partner_id'])
-            if partner:
-                conv['partner_name'] = partner.name
-                conv['partner_email'] = partner.email
-                conv['partner_role'] = partner.role
+        conversations = []
+        for row in rows:
+            conv = {
+                'partner_id': row['partner_id'],
+                'last_message': row['last_message'],
+                'last_time': row['last_time'],
+                'unread_count': row['unread_count']
+            }
+            if row['partner_exists']:
+                conv['partner_name'] = row['partner_name']
+                conv['partner_email'] = row['partner_email']
+                conv['partner_role'] = row['partner_role']
+            conversations.append(conv)
 
         return conversations
 
@@ -1,32 +1,188 @@
 import csv
 import os
+import queue
 import sqlite3
-from typing import Optional
+import threading
+from typing import Any, Dict, Optional
 from flask import g
 from config.config import Config
 
+# Set by init_db() once the books_fts index is known to exist.
+FTS_ENABLED = False
+
+# Bound on "IN (?, ?, ...)" lists; older SQLite builds cap variables at 999.
+MAX_SQL_PARAMS = 500
+
+# SQL expression producing a random UUID4 string, for INSERT ... SELECT.
+SQL_UUID4 = (
+    "lower(hex(randomblob(4))) || '-' || lower(hex(randomblob(2))) || '-4' || "
+    "substr(lower(hex(randomblob(2))), 2) || '-' || "
+    "substr('89ab', 1 + (abs(random()) % 4), 1) || "
+    "substr(lower(hex(randomblob(2))), 2) || '-' || lower(hex(randomblob(6)))"
+)
+
+
+def like_contains(text: str) -> str:
+    """Build a LIKE pattern matching ``text`` anywhere, taken literally.
+
+    ``%``, ``_`` and ``\\`` are escaped, so the pattern must be used with
+    ``LIKE ? ESCAPE '\\'``.
+    """
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+class ConnectionPool:
+    """Pool of SQLite connections shared by request and worker threads.
+
+    A connection is checked out by one thread at a time (stored on Flask
+    ``g`` for the request) and handed back on teardown, so connections and
+    their page caches survive across requests instead of being reopened.
+    When the pool is empty a new connection is opened rather than blocking;
+    connections returned beyond ``max_idle`` are closed.
+
+    Every connection runs in WAL mode with tuned pragmas, so readers no
+    longer wait behind a writer's commit.
+    """
+
+    def __init__(self, path: str, max_idle: int) -> None:
+        self.path = path
+        self.max_idle = max_idle
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._reused = 0
+        self._closed = 0
+        self._in_use = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection and apply the pragmas."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            timeout=Config.DB_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA cache_size = {-int(Config.DB_CACHE_SIZE_KB)}')
+        conn.execute(f'PRAGMA mmap_size = {int(Config.DB_MMAP_SIZE)}')
+        conn.execute(f'PRAGMA busy_timeout = {int(Config.DB_BUSY_TIMEOUT_MS)}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check out an idle connection, opening a new one if none is idle."""
+        try:
+            conn = self._idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            conn = self._connect()
+            reused = False
+
+        with self._lock:
+            self._in_use += 1
+            if reused:
+                self._reused += 1
+            else:
+                self._created += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection to the pool, discarding any open transaction."""
+        with self._lock:
+            self._in_use -= 1
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        if self._idle.qsize() >= self.max_idle:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        """Close a connection that is not going back into the pool."""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._closed += 1
+
+    def close_all(self) -> None:
+        """Close every idle connection (used at shutdown)."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool counters for monitoring."""
+        with self._lock:
+            return {
+                'path': self.path,
+                'max_idle': self.max_idle,
+                'idle': self._idle.qsize(),
+                'in_use': self._in_use,
+                'created': self._created,
+                'reused': self._reused,
+                'closed': self._closed,
+            }
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Get the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(Config.DATABASE_PATH, Config.DB_POOL_SIZE)
+    return _pool
+
+
+def close_pool() -> None:
+    """Close all idle pooled connections."""
+    if _pool is not None:
+        _pool.close_all()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Get connection pool statistics."""
+    return get_pool().stats()
+
 
 def get_db() -> sqlite3.Connection:
     """Get database connection from Flask application context.
 
+    The connection is checked out of the pool on first use in the
+    current context and returned by close_db() on teardown.
+
     Returns:
         SQLite database connection with Row factory enabled.
     """
     if 'db' not in g:
-        os.makedirs(os.path.dirname(Config.DATABASE_PATH), exist_ok=True)
-        g.db = sqlite3.connect(
-            Config.DATABASE_PATH,
-            detect_types=sqlite3.PARSE_DECLTYPES
-        )
-        g.db.row_factory = sqlite3.Row
+        g.db = get_pool().acquire()
     return g.db
 
 
 def close_db(e=None):
-    """Close database connection"""
+    """Return the context's database connection to the pool"""
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        get_pool().release(db)
 
 
 def init_db():
@@ -189,10 +345,593 @@ def init_db():
     
     db.commit()
     
+    # Create full-text search index over the catalogue
+    init_search_index(db)
+    
+    # Bring indexes and later schema changes up to date
+    apply_migrations(db)
+    
     # Insert mock data
     insert_mock_data(db)
 
 
+# Versioned schema migrations: (version, name, statements).
+# Append new entries with the next version number; never edit applied ones.
+MIGRATIONS = [
+    (1, 'hot query indexes', [
+        # Borrow limits, user dashboards: WHERE user_id = ? AND status ...
+        'CREATE INDEX IF NOT EXISTS idx_borrows_user_status '
+        'ON borrows (user_id, status, borrow_date)',
+        # Overdue/due-soon scans and staff lists: WHERE status = ? AND due_date ...
+        'CREATE INDEX IF NOT EXISTS idx_borrows_status_due '
+        'ON borrows (status, due_date)',
+        # Queue head and queue length per book
+        'CREATE INDEX IF NOT EXISTS idx_reservations_book_status_queue '
+        'ON reservations (book_id, status, queue_position)',
+        # Unread badge counts (covering)
+        'CREATE INDEX IF NOT EXISTS idx_notifications_user_read '
+        'ON notifications (user_id, is_read)',
+        'CREATE INDEX IF NOT EXISTS idx_chat_receiver_read '
+        'ON chat_messages (receiver_id, is_read)',
+        # Recent logs and log cleanup
+        'CREATE INDEX IF NOT EXISTS idx_system_logs_timestamp '
+        'ON system_logs (timestamp)',
+    ]),
+    (2, 'supporting lookup indexes', [
+        'CREATE INDEX IF NOT EXISTS idx_notifications_user_date '
+        'ON notifications (user_id, date)',
+        'CREATE INDEX IF NOT EXISTS idx_chat_pair_time '
+        'ON chat_messages (sender_id, receiver_id, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_borrows_book_status '
+        'ON borrows (book_id, status)',
+        'CREATE INDEX IF NOT EXISTS idx_borrows_status_pending '
+        'ON borrows (status, pending_until)',
+        'CREATE INDEX IF NOT EXISTS idx_reservations_user_book '
+        'ON reservations (user_id, book_id, reservation_date)',
+        'CREATE INDEX IF NOT EXISTS idx_reservations_status_hold '
+        'ON reservations (status, hold_until)',
+        'CREATE INDEX IF NOT EXISTS idx_reviews_book_date '
+        'ON reviews (book_id, date)',
+        'CREATE INDEX IF NOT EXISTS idx_reviews_user_book '
+        'ON reviews (user_id, book_id)',
+        'CREATE INDEX IF NOT EXISTS idx_violations_user_status '
+        'ON violations_history (user_id, payment_status)',
+    ]),
+    (3, 'book sort indexes', [
+        # Keyset pagination and home-page shelves (sort column + id tie-breaker)
+        'CREATE INDEX IF NOT EXISTS idx_books_title ON books (title, id)',
+        'CREATE INDEX IF NOT EXISTS idx_books_author ON books (author, id)',
+        'CREATE INDEX IF NOT EXISTS idx_books_year ON books (year, id)',
+        'CREATE INDEX IF NOT EXISTS idx_books_rating ON books (rating, id)',
+        'CREATE INDEX IF NOT EXISTS idx_books_borrow_count ON books (borrow_count, id)',
+        'CREATE INDEX IF NOT EXISTS idx_books_category ON books (category)',
+    ]),
+    (4, 'system config version', [
+        # Bumped on every SystemConfig.update() so caches can detect changes
+        'ALTER TABLE system_config ADD COLUMN version INTEGER NOT NULL DEFAULT 0',
+    ]),
+    (5, 'chat conversation summaries', [
+        # One row per (user, partner), maintained by ChatMessage.create/mark_as_read
+        '''CREATE TABLE IF NOT EXISTS conversations (
+            user_id TEXT NOT NULL,
+            partner_id TEXT NOT NULL,
+            last_message TEXT NOT NULL,
+            last_time TEXT NOT NULL,
+            unread_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, partner_id)
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_conversations_user_time '
+        'ON conversations (user_id, last_time)',
+        # Backfill from existing messages: latest message and unread count per pair
+        '''INSERT OR REPLACE INTO conversations
+               (user_id, partner_id, last_message, last_time, unread_count)
+           SELECT user_id, partner_id, message, timestamp, unread
+           FROM (
+               SELECT user_id, partner_id, message, timestamp,
+                      ROW_NUMBER() OVER (
+                          PARTITION BY user_id, partner_id
+                          ORDER BY timestamp DESC, id DESC
+                      ) AS rn,
+                      SUM(unread) OVER (PARTITION BY user_id, partner_id) AS unread
+               FROM (
+                   SELECT sender_id AS user_id, receiver_id AS partner_id,
+                          message, timestamp, id, 0 AS unread
+                   FROM chat_messages
+                   UNION ALL
+                   SELECT receiver_id, sender_id, message, timestamp, id,
+                          CASE WHEN is_read = 0 THEN 1 ELSE 0 END
+                   FROM chat_messages
+               )
+           )
+           WHERE rn = 1''',
+    ]),
+    (6, 'notification dedupe keys', [
+        # Set by scheduled jobs so the same notice is not sent twice in a day
+        'ALTER TABLE notifications ADD COLUMN dedupe_key TEXT',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_notifications_dedupe '
+        'ON notifications (dedupe_key) WHERE dedupe_key IS NOT NULL',
+    ]),
+    (7, 'category facet counts', [
+        # Per-category title counts, kept exact by the triggers below
+        '''CREATE TABLE IF NOT EXISTS category_facets (
+            category TEXT PRIMARY KEY,
+            book_count INTEGER NOT NULL DEFAULT 0,
+            available_count INTEGER NOT NULL DEFAULT 0
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS category_facets_ai AFTER INSERT ON books BEGIN
+            INSERT INTO category_facets (category, book_count, available_count)
+            VALUES (new.category, 1, new.available_copies > 0)
+            ON CONFLICT (category) DO UPDATE
+            SET book_count = book_count + 1,
+                available_count = available_count + (new.available_copies > 0);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS category_facets_ad AFTER DELETE ON books BEGIN
+            UPDATE category_facets
+            SET book_count = book_count - 1,
+                available_count = available_count - (old.available_copies > 0)
+            WHERE category = old.category;
+            DELETE FROM category_facets WHERE category = old.category AND book_count <= 0;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS category_facets_au
+        AFTER UPDATE OF category, available_copies ON books
+        WHEN old.category IS NOT new.category
+          OR (old.available_copies > 0) != (new.available_copies > 0)
+        BEGIN
+            UPDATE category_facets
+            SET book_count = book_count - 1,
+                available_count = available_count - (old.available_copies > 0)
+            WHERE category = old.category;
+            DELETE FROM category_facets WHERE category = old.category AND book_count <= 0;
+            INSERT INTO category_facets (category, book_count, available_count)
+            VALUES (new.category, 1, new.available_copies > 0)
+            ON CONFLICT (category) DO UPDATE
+            SET book_count = book_count + 1,
+                available_count = available_count + (new.available_copies > 0);
+        END''',
+        '''INSERT OR REPLACE INTO category_facets (category, book_count, available_count)
+           SELECT category, COUNT(*), SUM(available_copies > 0)
+           FROM books GROUP BY category''',
+    ]),
+    (8, 'scheduled job run history', [
+        # One row per scheduler run, written by scheduled_tasks.run_job
+        '''CREATE TABLE IF NOT EXISTS job_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            duration_ms REAL NOT NULL,
+            rows_processed INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL,
+            error TEXT
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_job_runs_started ON job_runs (started_at)',
+        'CREATE INDEX IF NOT EXISTS idx_job_runs_job_started '
+        'ON job_runs (job_id, started_at)',
+    ]),
+    (9, 'per-user unread counters', [
+        # Unread notifications and received chat messages per user, kept
+        # exact by the triggers below whatever path writes the rows
+        '''CREATE TABLE IF NOT EXISTS user_counters (
+            user_id TEXT PRIMARY KEY,
+            unread_notifications INTEGER NOT NULL DEFAULT 0,
+            unread_messages INTEGER NOT NULL DEFAULT 0
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS user_counters_notifications_ai
+        AFTER INSERT ON notifications WHEN new.is_read = 0 BEGIN
+            INSERT INTO user_counters (user_id, unread_notifications) VALUES (new.user_id, 1)
+            ON CONFLICT (user_id) DO UPDATE SET unread_notifications = unread_notifications + 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS user_counters_notifications_ad
+        AFTER DELETE ON notifications WHEN old.is_read = 0 BEGIN
+            UPDATE user_counters SET unread_notifications = unread_notifications - 1
+            WHERE user_id = old.user_id;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS user_counters_notifications_au
+        AFTER UPDATE OF is_read, user_id ON notifications
+        WHEN (old.is_read = 0) != (new.is_read = 0) OR old.user_id IS NOT new.user_id
+        BEGIN
+            UPDATE user_counters SET unread_notifications = unread_notifications - (old.is_read = 0)
+            WHERE user_id = old.user_id;
+            INSERT INTO user_counters (user_id, unread_notifications)
+            VALUES (new.user_id, new.is_read = 0)
+            ON CONFLICT (user_id) DO UPDATE
+            SET unread_notifications = unread_notifications + (new.is_read = 0);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS user_counters_messages_ai
+        AFTER INSERT ON chat_messages WHEN new.is_read = 0 BEGIN
+            INSERT INTO user_counters (user_id, unread_messages) VALUES (new.receiver_id, 1)
+            ON CONFLICT (user_id) DO UPDATE SET unread_messages = unread_messages + 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS user_counters_messages_ad
+        AFTER DELETE ON chat_messages WHEN old.is_read = 0 BEGIN
+            UPDATE user_counters SET unread_messages = unread_messages - 1
+            WHERE user_id = old.receiver_id;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS user_counters_messages_au
+        AFTER UPDATE OF is_read, receiver_id ON chat_messages
+        WHEN (old.is_read = 0) != (new.is_read = 0) OR old.receiver_id IS NOT new.receiver_id
+        BEGIN
+            UPDATE user_counters SET unread_messages = unread_messages - (old.is_read = 0)
+            WHERE user_id = old.receiver_id;
+            INSERT INTO user_counters (user_id, unread_messages)
+            VALUES (new.receiver_id, new.is_read = 0)
+            ON CONFLICT (user_id) DO UPDATE
+            SET unread_messages = unread_messages + (new.is_read = 0);
+        END''',
+        '''INSERT OR REPLACE INTO user_counters (user_id, unread_notifications, unread_messages)
+           SELECT user_id, SUM(notifications), SUM(messages)
+           FROM (
+               SELECT user_id, 1 AS notifications, 0 AS messages
+               FROM notifications WHERE is_read = 0
+               UNION ALL
+               SELECT receiver_id, 0, 1
+               FROM chat_messages WHERE is_read = 0
+           )
+           GROUP BY user_id''',
+    ]),
+    (10, 'staff dashboard panel indexes', [
+        # Paginated staff panels: newest/oldest first within a status
+        'CREATE INDEX IF NOT EXISTS idx_borrows_status_date '
+        'ON borrows (status, borrow_date)',
+        'CREATE INDEX IF NOT EXISTS idx_reservations_status_date '
+        'ON reservations (status, reservation_date)',
+        'CREATE INDEX IF NOT EXISTS idx_reservations_date '
+        'ON reservations (reservation_date)',
+        # Debtors list: WHERE fines > 0 ORDER BY fines DESC
+        'CREATE INDEX IF NOT EXISTS idx_users_fines ON users (fines)',
+    ]),
+    (11, 'library-wide dashboard counters', [
+        # One row of totals for the dashboards, kept exact by the triggers
+        # below; read through models.library_stats.LibraryStats
+        '''CREATE TABLE IF NOT EXISTS library_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_books INTEGER NOT NULL DEFAULT 0,
+            total_users INTEGER NOT NULL DEFAULT 0,
+            total_staff INTEGER NOT NULL DEFAULT 0,
+            active_borrows INTEGER NOT NULL DEFAULT 0,
+            total_fines REAL NOT NULL DEFAULT 0
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS library_stats_books_ai
+        AFTER INSERT ON books BEGIN
+            UPDATE library_stats SET total_books = total_books + 1 WHERE id = 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS library_stats_books_ad
+        AFTER DELETE ON books BEGIN
+            UPDATE library_stats SET total_books = total_books - 1 WHERE id = 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS library_stats_users_ai
+        AFTER INSERT ON users BEGIN
+            UPDATE library_stats SET
+                total_users = total_users + (new.role = 'user'),
+                total_staff = total_staff + (new.role = 'staff'),
+                total_fines = total_fines + IFNULL(new.fines, 0)
+            WHERE id = 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS library_stats_users_ad
+        AFTER DELETE ON users BEGIN
+            UPDATE library_stats SET
+                total_users = total_users - (old.role = 'user'),
+                total_staff = total_staff - (old.role = 'staff'),
+                total_fines = total_fines - IFNULL(old.fines, 0)
+            WHERE id = 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS library_stats_users_au
+        AFTER UPDATE OF role, fines ON users
+        WHEN old.role IS NOT new.role OR old.fines IS NOT new.fines
+        BEGIN
+            UPDATE library_stats SET
+                total_users = total_users - (old.role = 'user') + (new.role = 'user'),
+                total_staff = total_staff - (old.role = 'staff') + (new.role = 'staff'),
+                total_fines = total_fines - IFNULL(old.fines, 0) + IFNULL(new.fines, 0)
+            WHERE id = 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS library_stats_borrows_ai
+        AFTER INSERT ON borrows
+        WHEN new.status IN ('borrowed', 'pending_pickup', 'waiting')
+        BEGIN
+            UPDATE library_stats SET active_borrows = active_borrows + 1 WHERE id = 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS library_stats_borrows_ad
+        AFTER DELETE ON borrows
+        WHEN old.status IN ('borrowed', 'pending_pickup', 'waiting')
+        BEGIN
+            UPDATE library_stats SET active_borrows = active_borrows - 1 WHERE id = 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS library_stats_borrows_au
+        AFTER UPDATE OF status ON borrows
+        WHEN (old.status IN ('borrowed', 'pending_pickup', 'waiting'))
+          != (new.status IN ('borrowed', 'pending_pickup', 'waiting'))
+        BEGIN
+            UPDATE library_stats SET active_borrows = active_borrows
+                - (old.status IN ('borrowed', 'pending_pickup', 'waiting'))
+                + (new.status IN ('borrowed', 'pending_pickup', 'waiting'))
+            WHERE id = 1;
+        END''',
+        '''INSERT OR REPLACE INTO library_stats
+               (id, total_books, total_users, total_staff, active_borrows, total_fines)
+           SELECT 1,
+                  (SELECT COUNT(*) FROM books),
+                  (SELECT COUNT(*) FROM users WHERE role = 'user'),
+                  (SELECT COUNT(*) FROM users WHERE role = 'staff'),
+                  (SELECT COUNT(*) FROM borrows
+                   WHERE status IN ('borrowed', 'pending_pickup', 'waiting')),
+                  (SELECT TOTAL(fines) FROM users)''',
+    ]),
+    (12, 'per-book rating aggregates', [
+        # Review totals and star distribution per book, kept exact by the
+        # triggers below so the detail page never scans a book's reviews
+        '''CREATE TABLE IF NOT EXISTS book_ratings (
+            book_id TEXT PRIMARY KEY,
+            rating_sum INTEGER NOT NULL DEFAULT 0,
+            rating_count INTEGER NOT NULL DEFAULT 0,
+            stars_1 INTEGER NOT NULL DEFAULT 0,
+            stars_2 INTEGER NOT NULL DEFAULT 0,
+            stars_3 INTEGER NOT NULL DEFAULT 0,
+            stars_4 INTEGER NOT NULL DEFAULT 0,
+            stars_5 INTEGER NOT NULL DEFAULT 0
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS book_ratings_ai AFTER INSERT ON reviews BEGIN
+            INSERT INTO book_ratings
+                (book_id, rating_sum, rating_count, stars_1, stars_2, stars_3, stars_4, stars_5)
+            VALUES (new.book_id, new.rating, 1, new.rating = 1, new.rating = 2,
+                    new.rating = 3, new.rating = 4, new.rating = 5)
+            ON CONFLICT (book_id) DO UPDATE SET
+                rating_sum = rating_sum + excluded.rating_sum,
+                rating_count = rating_count + 1,
+                stars_1 = stars_1 + excluded.stars_1,
+                stars_2 = stars_2 + excluded.stars_2,
+                stars_3 = stars_3 + excluded.stars_3,
+                stars_4 = stars_4 + excluded.stars_4,
+                stars_5 = stars_5 + excluded.stars_5;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS book_ratings_ad AFTER DELETE ON reviews BEGIN
+            UPDATE book_ratings SET
+                rating_sum = rating_sum - old.rating,
+                rating_count = rating_count - 1,
+                stars_1 = stars_1 - (old.rating = 1),
+                stars_2 = stars_2 - (old.rating = 2),
+                stars_3 = stars_3 - (old.rating = 3),
+                stars_4 = stars_4 - (old.rating = 4),
+                stars_5 = stars_5 - (old.rating = 5)
+            WHERE book_id = old.book_id;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS book_ratings_au
+        AFTER UPDATE OF rating, book_id ON reviews
+        WHEN old.rating != new.rating OR old.book_id != new.book_id
+        BEGIN
+            UPDATE book_ratings SET
+                rating_sum = rating_sum - old.rating,
+                rating_count = rating_count - 1,
+                stars_1 = stars_1 - (old.rating = 1),
+                stars_2 = stars_2 - (old.rating = 2),
+                stars_3 = stars_3 - (old.rating = 3),
+                stars_4 = stars_4 - (old.rating = 4),
+                stars_5 = stars_5 - (old.rating = 5)
+            WHERE book_id = old.book_id;
+            INSERT INTO book_ratings
+                (book_id, rating_sum, rating_count, stars_1, stars_2, stars_3, stars_4, stars_5)
+            VALUES (new.book_id, new.rating, 1, new.rating = 1, new.rating = 2,
+                    new.rating = 3, new.rating = 4, new.rating = 5)
+            ON CONFLICT (book_id) DO UPDATE SET
+                rating_sum = rating_sum + excluded.rating_sum,
+                rating_count = rating_count + 1,
+                stars_1 = stars_1 + excluded.stars_1,
+                stars_2 = stars_2 + excluded.stars_2,
+                stars_3 = stars_3 + excluded.stars_3,
+                stars_4 = stars_4 + excluded.stars_4,
+                stars_5 = stars_5 + excluded.stars_5;
+        END''',
+        '''INSERT OR REPLACE INTO book_ratings
+               (book_id, rating_sum, rating_count, stars_1, stars_2, stars_3, stars_4, stars_5)
+           SELECT book_id, SUM(rating), COUNT(*), SUM(rating = 1), SUM(rating = 2),
+                  SUM(rating = 3), SUM(rating = 4), SUM(rating = 5)
+           FROM reviews GROUP BY book_id''',
+    ]),
+    (13, 'user favorites table', [
+        # Replaces the JSON array in users.favorites (no longer read)
+        '''CREATE TABLE IF NOT EXISTS user_favorites (
+            user_id TEXT NOT NULL,
+            book_id TEXT NOT NULL,
+            added_at TEXT NOT NULL,
+            PRIMARY KEY (user_id, book_id)
+        )''',
+        # Favorites list in the order the books were added
+        'CREATE INDEX IF NOT EXISTS idx_user_favorites_user_added '
+        'ON user_favorites (user_id, added_at)',
+        # Existing favorites keep their list order through rowid
+        '''INSERT OR IGNORE INTO user_favorites (user_id, book_id, added_at)
+           SELECT u.id, f.value, datetime('now', 'localtime')
+           FROM users u, json_each(u.favorites) f
+           WHERE json_valid(u.favorites) AND f.type = 'text'
+           ORDER BY u.id, f.key''',
+    ]),
+    (14, 'dashboard debtor count', [
+        # Users with outstanding fines, so the staff dashboard need not count them
+        'ALTER TABLE library_stats ADD COLUMN debtor_count INTEGER NOT NULL DEFAULT 0',
+        '''CREATE TRIGGER IF NOT EXISTS library_stats_debtors_ai
+        AFTER INSERT ON users WHEN IFNULL(new.fines, 0) > 0
+        BEGIN
+            UPDATE library_stats SET debtor_count = debtor_count + 1 WHERE id = 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS library_stats_debtors_ad
+        AFTER DELETE ON users WHEN IFNULL(old.fines, 0) > 0
+        BEGIN
+            UPDATE library_stats SET debtor_count = debtor_count - 1 WHERE id = 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS library_stats_debtors_au
+        AFTER UPDATE OF fines ON users
+        WHEN (IFNULL(old.fines, 0) > 0) != (IFNULL(new.fines, 0) > 0)
+        BEGIN
+            UPDATE library_stats SET debtor_count = debtor_count
+                - (IFNULL(old.fines, 0) > 0) + (IFNULL(new.fines, 0) > 0)
+            WHERE id = 1;
+        END''',
+        '''UPDATE library_stats
+           SET debtor_count = (SELECT COUNT(*) FROM users WHERE fines > 0)
+           WHERE id = 1''',
+    ]),
+    (15, 'dashboard fines total in minor units', [
+        # Fines are summed as integer hundredths: each row is rounded once,
+        # so trigger arithmetic cannot drift the way a REAL running total does
+        'ALTER TABLE library_stats ADD COLUMN total_fines_minor INTEGER NOT NULL DEFAULT 0',
+        'DROP TRIGGER IF EXISTS library_stats_users_ai',
+        'DROP TRIGGER IF EXISTS library_stats_users_ad',
+        'DROP TRIGGER IF EXISTS library_stats_users_au',
+        '''CREATE TRIGGER IF NOT EXISTS library_stats_users_ai
+        AFTER INSERT ON users BEGIN
+            UPDATE library_stats SET
+                total_users = total_users + (new.role = 'user'),
+                total_staff = total_staff + (new.role = 'staff'),
+                total_fines_minor = total_fines_minor
+                    + CAST(ROUND(IFNULL(new.fines, 0) * 100) AS INTEGER)
+            WHERE id = 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS library_stats_users_ad
+        AFTER DELETE ON users BEGIN
+            UPDATE library_stats SET
+                total_users = total_users - (old.role = 'user'),
+                total_staff = total_staff - (old.role = 'staff'),
+                total_fines_minor = total_fines_minor
+                    - CAST(ROUND(IFNULL(old.fines, 0) * 100) AS INTEGER)
+            WHERE id = 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS library_stats_users_au
+        AFTER UPDATE OF role, fines ON users
+        WHEN old.role IS NOT new.role OR old.fines IS NOT new.fines
+        BEGIN
+            UPDATE library_stats SET
+                total_users = total_users - (old.role = 'user') + (new.role = 'user'),
+                total_staff = total_staff - (old.role = 'staff') + (new.role = 'staff'),
+                total_fines_minor = total_fines_minor
+                    - CAST(ROUND(IFNULL(old.fines, 0) * 100) AS INTEGER)
+                    + CAST(ROUND(IFNULL(new.fines, 0) * 100) AS INTEGER)
+            WHERE id = 1;
+        END''',
+        'ALTER TABLE library_stats DROP COLUMN total_fines',
+        '''UPDATE library_stats
+           SET total_fines_minor = (
+               SELECT IFNULL(SUM(CAST(ROUND(IFNULL(fines, 0) * 100) AS INTEGER)), 0)
+               FROM users
+           )
+           WHERE id = 1''',
+    ]),
+]
+
+
+def apply_migrations(db):
+    """Apply pending schema migrations and record their versions.
+
+    Each migration runs in its own transaction together with the insert
+    into ``schema_migrations``, so a failed migration leaves no partial
+    changes and is retried on the next start.
+
+    Returns:
+        List of versions applied by this call.
+    """
+    from datetime import datetime
+
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    ''')
+    db.commit()
+
+    applied = {
+        row['version']
+        for row in db.execute('SELECT version FROM schema_migrations').fetchall()
+    }
+
+    newly_applied = []
+    for version, name, statements in MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            db.execute('BEGIN')
+            for statement in statements:
+                db.execute(statement)
+            db.execute(
+                'INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)',
+                (version, name, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            db.commit()
+        except sqlite3.Error as e:
+            db.rollback()
+            print(f"Error applying migration {version} ({name}): {e}")
+            raise
+        newly_applied.append(version)
+
+    if newly_applied:
+        # Refresh planner statistics for the new indexes
+        db.execute('PRAGMA optimize')
+
+    return newly_applied
+
+
+def get_schema_version(db) -> int:
+    """Get the highest applied migration version (0 if none)."""
+    row = db.execute('SELECT MAX(version) AS version FROM schema_migrations').fetchone()
+    return row['version'] or 0
+
+
+def init_search_index(db):
+    """Create the FTS5 index for books and the triggers keeping it in sync.
+
+    The index is an external-content table over ``books`` keyed by rowid,
+    so the text is not stored twice. When the table is created for an
+    existing database it is rebuilt from ``books`` once. If the SQLite
+    build has no FTS5 support, searching falls back to LIKE queries.
+    """
+    global FTS_ENABLED
+
+    exists = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'"
+    ).fetchone()
+
+    try:
+        db.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+                title, author, category, publisher, description,
+                content='books', content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"Warning: FTS5 not available ({e}). Using LIKE search.")
+        FTS_ENABLED = False
+        return
+
+    db.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts (rowid, title, author, category, publisher, description)
+            VALUES (new.rowid, new.title, new.author, new.category, new.publisher, new.description);
+        END
+    ''')
+    db.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author, category, publisher, description)
+            VALUES ('delete', old.rowid, old.title, old.author, old.category, old.publisher, old.description);
+        END
+    ''')
+    # Only re-index when searchable text changes, not on inventory updates
+    db.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_au
+        AFTER UPDATE OF title, author, category, publisher, description ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author, category, publisher, description)
+            VALUES ('delete', old.rowid, old.title, old.author, old.category, old.publisher, old.description);
+            INSERT INTO books_fts (rowid, title, author, category, publisher, description)
+            VALUES (new.rowid, new.title, new.author, new.category, new.publisher, new.description);
+        END
+    ''')
+
+    if not exists:
+        db.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+
+    db.commit()
+    FTS_ENABLED = True
+
+
 def insert_mock_data(db):
     """Insert mock data for testing"""
     import json
@@ -12,7 +12,7 @@ class Fine:
         self.status = status
 
     @staticmethod
-    def create(user_id, amount, reason, borrow_id=None):
+    def create(user_id, amount, reason, borrow_id=None, commit=True):
         """Create violation record and track fine amount.
         
         Properly handles violations_history table creation
@@ -22,6 +22,9 @@ class Fine:
             amount: Fine amount (VND)
             reason: Reason for fine (late fee, damage, etc.)
             borrow_id: Associated borrow transaction ID
+            commit: If False, rows are written in the caller's transaction
+                and left for the caller to commit (errors are raised so the
+                caller can roll back); the caller then invalidates the user
             
         Returns:
             fine_id if successful, None otherwise
@@ -51,10 +54,16 @@ class Fine:
                 (amount, user_id)
             )
             
-            db.commit()
+            if commit:
+                db.commit()
+                
+                from models.user import User
+                User.invalidate_cache(user_id)
             
             return fine_id
         except Exception as e:
+            if not commit:
+                raise
             db.rollback()
             print(f"Error creating fine: {e}")
             return None
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from models.database import get_db
+
+
+class JobRun:
+    """Run history of the background scheduler jobs.
+
+    One row is recorded per run with its duration, the number of rows the
+    job processed and the error, if any. No instances are created.
+    """
+
+    # Runs older than this are pruned when a new run is recorded
+    RETENTION_DAYS = 30
+
+    @staticmethod
+    def record(job_id: str, started_at: datetime, duration_ms: float,
+               rows_processed: int = 0, error: Optional[str] = None) -> None:
+        """Record a finished run and prune expired history.
+
+        Args:
+            job_id: Scheduler job ID.
+            started_at: When the run started.
+            duration_ms: Wall-clock duration of the run in milliseconds.
+            rows_processed: Rows the job reported as processed.
+            error: Error message if the run failed.
+        """
+        db = get_db()
+        cutoff = (datetime.now() - timedelta(days=JobRun.RETENTION_DAYS)).strftime('%Y-%m-%d %H:%M:%S')
+        db.execute('''
+            INSERT INTO job_runs (job_id, started_at, duration_ms, rows_processed, status, error)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (job_id, started_at.strftime('%Y-%m-%d %H:%M:%S'), duration_ms,
+              rows_processed, 'error' if error else 'success', error))
+        db.execute('DELETE FROM job_runs WHERE started_at < ?', (cutoff,))
+        db.commit()
+
+    @staticmethod
+    def get_recent(limit: int = 50) -> List[Dict[str, Any]]:
+        """Get the most recent runs of all jobs.
+
+        Args:
+            limit: Maximum number of runs to retrieve.
+
+        Returns:
+            List of runs as dictionaries, newest first.
+        """
+        db = get_db()
+        rows = db.execute('''
+            SELECT * FROM job_runs
+            ORDER BY started_at DESC, id DESC
+            LIMIT ?
+        ''', (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def get_summary() -> List[Dict[str, Any]]:
+        """Get per-job aggregates over the retained history.
+
+        Returns:
+            One dictionary per job with run and error counts, average and
+            maximum duration, and the time and status of its last run.
+        """
+        db = get_db()
+        rows = db.execute('''
+            SELECT job_id,
+                   COUNT(*) AS runs,
+                   SUM(status = 'error') AS errors,
+                   AVG(duration_ms) AS avg_ms,
+                   MAX(duration_ms) AS max_ms,
+                   MAX(started_at) AS last_started_at,
+                   (SELECT status FROM job_runs last
+                    WHERE last.job_id = job_runs.job_id
+                    ORDER BY started_at DESC, id DESC LIMIT 1) AS last_status
+            FROM job_runs
+            GROUP BY job_id
+            ORDER BY job_id
+        ''').fetchall()
+        return [dict(row) for row in rows]
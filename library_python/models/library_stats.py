@@ -0,0 +1,50 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from config.config import Config
+from models.database import get_db
+
+
+class LibraryStats:
+    """Library-wide totals shown on the staff and admin dashboards.
+
+    Book, user, debtor and active borrow counts and the outstanding fines
+    are read from the one-row ``library_stats`` table, which triggers on
+    books, users and borrows keep up to date; fines are kept in integer
+    hundredths and returned in VND. The overdue count depends on the
+    clock, so it is counted in the same query from the (status, due_date)
+    index. Results are cached per process for STATS_CACHE_TTL_SECONDS.
+    No instances are created.
+    """
+
+    _lock = threading.Lock()
+    _cached: Optional[Tuple[float, Dict[str, Any]]] = None
+
+    @staticmethod
+    def get() -> Dict[str, Any]:
+        """Get the current totals.
+
+        Returns:
+            Dictionary with total_books, total_users (role 'user'),
+            total_staff, active_borrows, overdue_count, total_fines and
+            debtor_count (users with fines).
+        """
+        cached = LibraryStats._cached
+        if cached is not None and cached[0] > time.monotonic():
+            return dict(cached[1])
+
+        db = get_db()
+        row = db.execute('''
+            SELECT total_books, total_users, total_staff, active_borrows,
+                   total_fines_minor / 100.0 AS total_fines, debtor_count,
+                   (SELECT COUNT(*) FROM borrows
+                    WHERE status = 'borrowed' AND due_date < ?) AS overdue_count
+            FROM library_stats WHERE id = 1
+        ''', (datetime.now().strftime('%Y-%m-%d'),)).fetchone()
+        stats = dict(row)
+
+        with LibraryStats._lock:
+            LibraryStats._cached = (time.monotonic() + Config.STATS_CACHE_TTL_SECONDS, stats)
+        return dict(stats)
+
@@ -1,7 +1,7 @@
 import uuid
-from datetime import datetime
-from typing import List, Optional
-from models.database import get_db
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional
+from models.database import SQL_UUID4, get_db
 
 
 class Notification:
@@ -15,10 +15,15 @@ class Notification:
         message: Notification message content.
         date: When the notification was created.
         is_read: Whether the notification has been read.
+        dedupe_key: Optional key preventing duplicate scheduled notices.
     """
 
+    # Rows inserted per transaction by the bulk fan-out paths
+    BATCH_SIZE = 1000
+
     def __init__(self, id: str, user_id: str, type: str, title: str,
-                 message: str, date: str, is_read: int) -> None:
+                 message: str, date: str, is_read: int,
+                 dedupe_key: Optional[str] = None) -> None:
         """Initialize a Notification instance."""
         self.id = id
         self.user_id = user_id
@@ -27,6 +32,7 @@ class Notification:
         self.message = message
         self.date = date
         self.is_read = bool(is_read)
+        self.dedupe_key = dedupe_key
 
     @staticmethod
     def create(user_id: str, notification_type: str,
@@ -45,7 +51,8 @@ class Notification:
         ''', (notification_id, user_id, notification_type, title, message, date))
         db.commit()
 
-        return Notification.get_by_id(notification_id)
+        return Notification(notification_id, user_id, notification_type,
+                            title, message, date, 0)
 
     @staticmethod
     def get_by_id(notification_id: str) -> Optional['Notification']:
@@ -74,13 +81,13 @@ class Notification:
 
     @staticmethod
     def get_unread_count(user_id: str) -> int:
-        """Get count of unread notifications."""
+        """Get count of unread notifications (from user_counters)."""
         db = get_db()
-        row = db.execute('''
-            SELECT COUNT(*) as count FROM notifications 
-            WHERE user_id = ? AND is_read = 0
-        ''', (user_id,)).fetchone()
-        return row['count']
+        row = db.execute(
+            'SELECT unread_notifications FROM user_counters WHERE user_id = ?',
+            (user_id,)
+        ).fetchone()
+        return row['unread_notifications'] if row else 0
 
     @staticmethod
     def mark_as_read(notification_id: str) -> None:
@@ -97,7 +104,7 @@ class Notification:
         """Mark all notifications as read for a user."""
         db = get_db()
         db.execute(
-            'UPDATE notifications SET is_read = 1 WHERE user_id = ?',
+            'UPDATE notifications SET is_read = 1 WHERE user_id = ? AND is_read = 0',
             (user_id,)
         )
         db.commit()
@@ -110,31 +117,167 @@ class Notification:
         db.commit()
 
     @staticmethod
-    def send_to_all_users(notification_type: str, title: str,
-                          message: str) -> List['Notification']:
-        """Send notification to all users."""
+    def bulk_create(user_ids: Iterable[str], notification_type: str,
+                    title: str, message: str,
+                    on_progress: Optional[Callable[[int], None]] = None,
+                    commit: bool = True) -> int:
+        """Create the same notification for many users.
+
+        Rows are inserted with executemany in transactions of BATCH_SIZE,
+        and nothing is read back.
+
+        Args:
+            user_ids: Recipients.
+            notification_type: Notification type.
+            title: Notification title.
+            message: Notification message.
+            on_progress: Optional callback receiving the running total
+                after each committed batch.
+            commit: If False, rows are written in the caller's transaction
+                and left for the caller to commit.
+
+        Returns:
+            Number of notifications created.
+        """
+        if not title or not message:
+            return 0
+
+        db = get_db()
+        date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        sent = 0
+        batch = []
+
+        def flush() -> None:
+            nonlocal sent
+            db.executemany('''
+                INSERT INTO notifications (id, user_id, type, title, message, date, is_read)
+                VALUES (?, ?, ?, ?, ?, ?, 0)
+            ''', batch)
+            if commit:
+                db.commit()
+            sent += len(batch)
+            batch.clear()
+            if on_progress:
+                on_progress(sent)
+
+        for user_id in user_ids:
+            batch.append((str(uuid.uuid4()), user_id, notification_type,
+                          title, message, date))
+            if len(batch) >= Notification.BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+
+        return sent
+
+    @staticmethod
+    def send_due_date_reminders(days_ahead: int = 3) -> int:
+        """Notify borrowers whose books are due within ``days_ahead`` days.
+
+        One INSERT ... SELECT computes the days remaining and the message
+        in SQL. A per-borrow, per-day dedupe key makes re-runs on the same
+        day a no-op.
+
+        Returns:
+            Number of reminders created.
+        """
+        db = get_db()
+        now = datetime.now()
+        now_str = now.strftime('%Y-%m-%d %H:%M:%S')
+        until_str = (now + timedelta(days=days_ahead)).strftime('%Y-%m-%d %H:%M:%S')
+        today = now.strftime('%Y-%m-%d')
+
+        cursor = db.execute(f'''
+            INSERT OR IGNORE INTO notifications
+                (id, user_id, type, title, message, date, is_read, dedupe_key)
+            SELECT {SQL_UUID4}, user_id, 'reminder', 'Book Due Date Reminder',
+                   'Reminder: "' || book_title || '" is due in ' || days_remaining ||
+                   ' day(s) on ' || substr(due_date, 1, 10) ||
+                   '. Please return or renew it.',
+                   :now, 0, 'due_reminder:' || borrow_id || ':' || :today
+            FROM (
+                SELECT b.id AS borrow_id, b.user_id, b.due_date, bk.title AS book_title,
+                       CAST(julianday(b.due_date) - julianday(:now) AS INTEGER) AS days_remaining
+                FROM borrows b
+                JOIN users u ON b.user_id = u.id
+                JOIN books bk ON b.book_id = bk.id
+                WHERE b.status = 'borrowed' AND b.due_date <= :until AND b.due_date > :now
+            )
+        ''', {'now': now_str, 'until': until_str, 'today': today})
+        db.commit()
+        return cursor.rowcount
+
+    @staticmethod
+    def send_overdue_alerts() -> int:
+        """Notify borrowers of overdue books, at most once per borrow per day.
+
+        Returns:
+            Number of alerts created.
+        """
         db = get_db()
+        now = datetime.now()
+        now_str = now.strftime('%Y-%m-%d %H:%M:%S')
+        today = now.strftime('%Y-%m-%d')
+
+        cursor = db.execute(f'''
+            INSERT OR IGNORE INTO notifications
+                (id, user_id, type, title, message, date, is_read, dedupe_key)
+            SELECT {SQL_UUID4}, user_id, 'alert', 'Overdue Book Alert',
+                   'Overdue Alert: "' || book_title || '" is ' || days_overdue ||
+                   ' day(s) overdue. Late fees are accumulating. Please return immediately.',
+                   :now, 0, 'overdue:' || borrow_id || ':' || :today
+            FROM (
+                SELECT b.id AS borrow_id, b.user_id, bk.title AS book_title,
+                       CAST(julianday(:now) - julianday(b.due_date) AS INTEGER) AS days_overdue
+                FROM borrows b
+                JOIN users u ON b.user_id = u.id
+                JOIN books bk ON b.book_id = bk.id
+                WHERE b.status = 'borrowed' AND b.due_date < :now
+            )
+        ''', {'now': now_str, 'today': today})
+        db.commit()
+        return cursor.rowcount
 
-        # Get all users with role 'user'
-        users = db.execute("SELECT id FROM users WHERE role = 'user'").fetchall()
+    @staticmethod
+    def _iter_member_ids() -> Iterable[str]:
+        """Yield IDs of all 'user' role accounts, one keyset page at a time."""
+        db = get_db()
+        last_id = ''
+        while True:
+            rows = db.execute('''
+                SELECT id FROM users
+                WHERE role = 'user' AND id > ?
+                ORDER BY id
+                LIMIT ?
+            ''', (last_id, Notification.BATCH_SIZE)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row['id']
+            last_id = rows[-1]['id']
 
-        notifications = []
-        for user in users:
-            notif = Notification.create(user['id'], notification_type, title, message)
-            notifications.append(notif)
+    @staticmethod
+    def send_to_all_users(notification_type: str, title: str, message: str,
+                          on_progress: Optional[Callable[[int], None]] = None) -> int:
+        """Send notification to all users.
 
-        return notifications
+        Returns:
+            Number of users notified.
+        """
+        return Notification.bulk_create(
+            Notification._iter_member_ids(), notification_type,
+            title, message, on_progress
+        )
 
     @staticmethod
     def send_to_specific_users(user_ids: List[str], notification_type: str,
-                               title: str, message: str) -> List['Notification']:
-        """Send notification to specific users."""
-        notifications = []
-        for user_id in user_ids:
-            notif = Notification.create(user_id, notification_type, title, message)
-            notifications.append(notif)
+                               title: str, message: str) -> int:
+        """Send notification to specific users.
 
-        return notifications
+        Returns:
+            Number of users notified.
+        """
+        return Notification.bulk_create(user_ids, notification_type, title, message)
 
     def to_dict(self) -> dict:
         """Convert notification to dictionary."""
@@ -1,9 +1,19 @@
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import Optional, List, Tuple
 import uuid
-from models.database import get_db
+from config.config import Config
+from models.database import get_db, like_contains
 from models.book import Book
 
+# Exact 1-based rank of a waiting reservation ``r`` in its book's queue
+QUEUE_RANK_SQL = '''
+    CASE WHEN r.status = 'waiting' THEN (
+        SELECT COUNT(*) FROM reservations q
+        WHERE q.book_id = r.book_id AND q.status = 'waiting'
+          AND q.queue_position < r.queue_position
+    ) + 1 END
+'''
 
 class Reservation:
     """Represents a book reservation in the queue.
@@ -16,13 +26,15 @@ class Reservation:
         status (str): Reservation status ('waiting', 'ready', 'expired', 'cancelled', 'completed').
         notified_date (str): When user was notified (for ready status).
         hold_until (str): Deadline for picking up (ready status).
-        queue_position (int): Position in the reservation queue.
+        queue_position (int): Enqueue sequence number within the book's queue.
+            It only orders the queue and is never renumbered, so it can have
+            gaps; use get_queue_position() for the rank.
     """
     
     def __init__(self, id: str, user_id: str, book_id: str, 
                  reservation_date: str, status: str, 
                  notified_date: Optional[str], hold_until: Optional[str],
-                 queue_position: int) -> None:
+                 queue_position: int, queue_rank: Optional[int] = None) -> None:
         """Initialize a Reservation instance."""
         self.id = id
         self.user_id = user_id
@@ -32,10 +44,15 @@ class Reservation:
         self.notified_date = notified_date
         self.hold_until = hold_until
         self.queue_position = queue_position
+        self._queue_rank = queue_rank
     
     @staticmethod
     def create(user_id: str, book_id: str) -> Tuple[Optional['Reservation'], str]:
-        """Create a new reservation for a book."""
+        """Create a new reservation for a book.
+        
+        Must not be called with a transaction open on the request connection;
+        such calls fail without touching the caller's writes.
+        """
         db = get_db()
         
         book = Book.get_by_id(book_id)
@@ -53,38 +70,54 @@ class Reservation:
         if existing:
             return None, "You already have a reservation for this book"
         
-        max_position = db.execute('''
-            SELECT MAX(queue_position) as max_pos FROM reservations
-            WHERE book_id = ? AND status = 'waiting'
-        ''', (book_id,)).fetchone()
-        
-        next_position = (max_position['max_pos'] or 0) + 1
-        
         reservation_id = str(uuid.uuid4())
         reservation_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
+        if db.in_transaction:
+            # Committing here would save the caller's pending writes with
+            # the reservation, and rolling back would discard them; refuse instead
+            print("Error creating reservation: called inside an open transaction")
+            return None, "Failed to create reservation"
+        
         try:
+            # Hold the write lock so concurrent reservations get distinct
+            # sequence numbers
+            db.execute('BEGIN IMMEDIATE')
+            # One index seek while the write lock is held
+            max_seq = db.execute('''
+                SELECT MAX(queue_position) FROM reservations
+                WHERE book_id = ? AND status = 'waiting'
+            ''', (book_id,)).fetchone()[0]
+            next_seq = (max_seq or 0) + 1
+            
             db.execute('''
                 INSERT INTO reservations 
                 (id, user_id, book_id, reservation_date, status, 
                  notified_date, hold_until, queue_position)
                 VALUES (?, ?, ?, ?, 'waiting', NULL, NULL, ?)
-            ''', (reservation_id, user_id, book_id, reservation_date, next_position))
+            ''', (reservation_id, user_id, book_id, reservation_date, next_seq))
             db.commit()
             
+            # Rank among the waiting reservations, counted after the lock is
+            # released (one indexed COUNT)
+            reservation = Reservation(reservation_id, user_id, book_id, reservation_date,
+                                      'waiting', None, None, next_seq)
+            position = reservation.get_queue_position()
+            
             from models.system_log import SystemLog
             from models.user import User
             user = User.get_by_id(user_id)
             if user:
                 SystemLog.add(
                     'Book Reservation',
-                    f'{user.name} reserved "{book.title}" (Position: {next_position})',
+                    f'{user.name} reserved "{book.title}" (Position: {position})',
                     'info',
                     user_id
                 )
             
-            return Reservation.get_by_id(reservation_id), f"Book reserved successfully (Queue position: {next_position})"
+            return reservation, f"Book reserved successfully (Queue position: {position})"
         except Exception as e:
+            db.rollback()
             print(f"Error creating reservation: {e}")
             return None, "Failed to create reservation"
     
@@ -107,16 +140,18 @@ class Reservation:
         db = get_db()
         
         if status:
-            rows = db.execute('''
-                SELECT * FROM reservations 
-                WHERE user_id = ? AND status = ?
-                ORDER BY reservation_date DESC
+            rows = db.execute(f'''
+                SELECT r.*, {QUEUE_RANK_SQL} AS queue_rank
+                FROM reservations r
+                WHERE r.user_id = ? AND r.status = ?
+                ORDER BY r.reservation_date DESC
             ''', (user_id, status)).fetchall()
         else:
-            rows = db.execute('''
-                SELECT * FROM reservations 
-                WHERE user_id = ?
-                ORDER BY reservation_date DESC
+            rows = db.execute(f'''
+                SELECT r.*, {QUEUE_RANK_SQL} AS queue_rank
+                FROM reservations r
+                WHERE r.user_id = ?
+                ORDER BY r.reservation_date DESC
             ''', (user_id,)).fetchall()
         
         return [Reservation(**dict(row)) for row in rows]
@@ -166,13 +201,49 @@ class Reservation:
     def get_all() -> List['Reservation']:
         """Get all reservations."""
         db = get_db()
-        rows = db.execute('''
-            SELECT * FROM reservations
-            ORDER BY reservation_date DESC
+        rows = db.execute(f'''
+            SELECT r.*, {QUEUE_RANK_SQL} AS queue_rank
+            FROM reservations r
+            ORDER BY r.reservation_date DESC
         ''').fetchall()
         
         return [Reservation(**dict(row)) for row in rows]
-    
+
+    @staticmethod
+    def get_page(status: str = '', query: str = '', page: int = 1,
+                 per_page: int = 20) -> Tuple[List['Reservation'], bool]:
+        """Get one page of reservations, newest first, for staff panels.
+
+        Args:
+            status: Only reservations with this status, or '' for all.
+            query: Case-insensitive substring of the user's name.
+            page: 1-based page number.
+            per_page: Page size.
+
+        Returns:
+            Tuple of (reservations, has_more). Ranks are selected with the
+            page, so get_queue_position() on these runs no query.
+        """
+        db = get_db()
+        sql = f'SELECT r.*, {QUEUE_RANK_SQL} AS queue_rank FROM reservations r'
+        conditions = []
+        params = []
+        if query:
+            sql += ' JOIN users u ON u.id = r.user_id'
+            conditions.append("LOWER(u.name) LIKE ? ESCAPE '\\'")
+            params.append(like_contains(query.lower()))
+        if status:
+            conditions.append('r.status = ?')
+            params.append(status)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY r.reservation_date DESC, r.id LIMIT ? OFFSET ?'
+        params.extend([per_page + 1, (max(page, 1) - 1) * per_page])
+
+        rows = db.execute(sql, params).fetchall()
+        reservations = [Reservation(**dict(row)) for row in rows[:per_page]]
+        return reservations, len(rows) > per_page
+
     @staticmethod
     def get_ready_reservations_for_book(book_id: str) -> List['Reservation']:
         """Get all reservations marked as 'ready' for a specific book."""
@@ -185,6 +256,96 @@ class Reservation:
 
         return [Reservation(**dict(row)) for row in rows]
     
+    @staticmethod
+    def promote_waiting(book_id: str, copies: int, hold_hours: int = 48) -> int:
+        """Hand newly available copies of a book to the front of its queue.
+        
+        The first ``copies`` waiting reservations are marked ready in one
+        UPDATE and their holders are notified in bulk. Runs in the
+        surrounding ``Book.batch_updates`` block, which commits it together
+        with the caller's writes; one log entry per promoted user is written
+        after that commit.
+        
+        Args:
+            book_id: Book whose copies became available.
+            copies: Number of copies that became available.
+            hold_hours: How long each promoted holder has to pick up.
+            
+        Returns:
+            Number of reservations promoted (at most ``copies``).
+        """
+        if copies <= 0:
+            return 0
+        
+        from models.notification import Notification
+        from models.system_log import SystemLog
+        
+        db = get_db()
+        now = datetime.now()
+        hold_until = (now + timedelta(hours=hold_hours)).strftime('%Y-%m-%d %H:%M:%S')
+        notified_date = now.strftime('%Y-%m-%d %H:%M:%S')
+        
+        with Book.batch_updates() as changes:
+            rows = db.execute('''
+                UPDATE reservations
+                SET status = 'ready', notified_date = ?, hold_until = ?
+                WHERE id IN (
+                    SELECT id FROM reservations
+                    WHERE book_id = ? AND status = 'waiting'
+                    ORDER BY queue_position ASC
+                    LIMIT ?
+                )
+                RETURNING user_id
+            ''', (notified_date, hold_until, book_id, copies)).fetchall()
+            user_ids = [row['user_id'] for row in rows]
+            
+            book = Book.get_by_id(book_id)
+            if user_ids and book:
+                Notification.bulk_create(
+                    user_ids,
+                    'success',
+                    'Reserved Book Available',
+                    f'Your reserved book "{book.title}" is now available! '
+                    f'Please pick it up before {hold_until}. '
+                    f'If not picked up within {hold_hours} hours, the reservation will expire.',
+                    commit=False
+                )
+                
+                def log_promotions() -> None:
+                    for user_id in user_ids:
+                        SystemLog.add(
+                            'Reservation Ready',
+                            f'User notified that "{book.title}" is ready for pickup. '
+                            f'Hold until: {hold_until}',
+                            'info',
+                            user_id
+                        )
+                
+                changes.on_commit(log_promotions)
+        
+        return len(user_ids)
+    
+    @staticmethod
+    def release_copies(book: Book, copies: int, hold_hours: int = 48) -> int:
+        """Make copies of a book available, serving the queue first.
+        
+        Waiting reservations are promoted into the hidden pool first and any
+        remaining copies go back to public inventory, all in one commit (or
+        in the surrounding ``Book.batch_updates`` block).
+        
+        Args:
+            book: Book whose copies became available.
+            copies: Number of copies that became available.
+            hold_hours: How long each promoted holder has to pick up.
+            
+        Returns:
+            Number of copies that went to reservations.
+        """
+        with Book.batch_updates():
+            promoted = Reservation.promote_waiting(book.id, copies, hold_hours)
+            book.update_available_copies(copies - promoted)
+        return promoted
+    
     def mark_ready(self, hold_hours: int = 48) -> Tuple[bool, str]:
         """Mark reservation as ready for pickup."""
         if self.status != 'waiting':
@@ -255,70 +416,44 @@ class Reservation:
         
         was_ready = (self.status == 'ready')
         
-        # Mark this reservation as cancelled
-        self.status = 'cancelled'
-        db.execute(
-            'UPDATE reservations SET status = ? WHERE id = ?',
-            ('cancelled', self.id)
-        )
-        
-        # ========== CRITICAL: CASCADE LOGIC ==========
-        if was_ready:
-            # This person was holding a spot in hidden inventory
-            # Check if there's someone else waiting
-            next_reservation = Reservation.get_next_in_queue(self.book_id)
+        with Book.batch_updates() as changes:
+            # Mark this reservation as cancelled
+            self.status = 'cancelled'
+            db.execute(
+                'UPDATE reservations SET status = ? WHERE id = ?',
+                ('cancelled', self.id)
+            )
             
-            if next_reservation:
-                # CASCADE: Pass the book to next person in queue
-                # Book stays in HIDDEN POOL - do NOT increase available_copies
-                success, msg = next_reservation.mark_ready(hold_hours=48)
-                
-                if success:
-                    SystemLog.add(
+            # ========== CRITICAL: CASCADE LOGIC ==========
+            if was_ready:
+                # This person was holding a spot in hidden inventory: pass it
+                # to the next in queue, or back to public if no one is waiting
+                if Reservation.release_copies(book, 1):
+                    changes.on_commit(lambda: SystemLog.add(
                         'Hidden Inventory Cascade',
                         f'Book "{book.title}" cascaded to next reserver after cancellation. '
                         f'Available copies NOT increased (still in hidden pool).',
                         'info',
                         None
-                    )
+                    ))
                 else:
-                    # Cascade failed - return to public as fallback
-                    book.update_available_copies(1)
-                    SystemLog.add(
-                        'Cascade Failed - Public Return',
-                        f'Failed to cascade "{book.title}" to next reserver: {msg}. '
-                        f'Book returned to public inventory.',
-                        'warning',
+                    changes.on_commit(lambda: SystemLog.add(
+                        'Hidden to Public Pool',
+                        f'Book "{book.title}" returned from hidden pool to public inventory '
+                        f'(last reservation cancelled, queue empty).',
+                        'info',
                         None
-                    )
+                    ))
             else:
-                # NO ONE WAITING: Return book to PUBLIC INVENTORY
-                book.update_available_copies(1)
-                SystemLog.add(
-                    'Hidden to Public Pool',
-                    f'Book "{book.title}" returned from hidden pool to public inventory '
-                    f'(last reservation cancelled, queue empty).',
+                # Cancelling a 'waiting' reservation just leaves a gap in the
+                # sequence; ranks of the remaining waiters are computed on read
+                changes.on_commit(lambda: SystemLog.add(
+                    'Waiting Reservation Cancelled',
+                    f'User cancelled waiting reservation for "{book.title}".',
                     'info',
-                    None
-                )
-        else:
-            # Cancelling a 'waiting' reservation
-            # Reorder queue positions for remaining waiters
-            db.execute('''
-                UPDATE reservations
-                SET queue_position = queue_position - 1
-                WHERE book_id = ? AND status = 'waiting' AND queue_position > ?
-            ''', (self.book_id, self.queue_position))
-            
-            SystemLog.add(
-                'Waiting Reservation Cancelled',
-                f'User cancelled waiting reservation for "{book.title}". '
-                f'Queue reordered.',
-                'info',
-                self.user_id
-            )
+                    self.user_id
+                ))
         
-        db.commit()
         return True, "Reservation cancelled successfully"
     
     def mark_expired(self) -> Tuple[bool, str]:
@@ -336,70 +471,72 @@ class Reservation:
         if not book:
             return False, "Book not found"
         
-        # Mark as expired
-        self.status = 'expired'
-        db.execute(
-            'UPDATE reservations SET status = ? WHERE id = ?',
-            ('expired', self.id)
-        )
-        
-        # ========== CRITICAL: CASCADE LOGIC (same as cancel) ==========
-        next_reservation = Reservation.get_next_in_queue(self.book_id)
-        
-        if next_reservation:
-            # CASCADE to next person
-            success, msg = next_reservation.mark_ready(hold_hours=48)
+        with Book.batch_updates() as changes:
+            # Mark as expired
+            self.status = 'expired'
+            db.execute(
+                'UPDATE reservations SET status = ? WHERE id = ?',
+                ('expired', self.id)
+            )
             
-            if success:
-                SystemLog.add(
+            # ========== CRITICAL: CASCADE LOGIC (same as cancel) ==========
+            if Reservation.release_copies(book, 1):
+                changes.on_commit(lambda: SystemLog.add(
                     'Expired Reservation Cascade',
                     f'Book "{book.title}" cascaded to next reserver after expiration. '
                     f'Available copies NOT increased.',
                     'info',
                     None
-                )
+                ))
             else:
-                # Cascade failed - return to public
-                book.update_available_copies(1)
-                SystemLog.add(
-                    'Cascade Failed - Public Return',
-                    f'Failed to cascade "{book.title}" after expiration: {msg}. '
-                    f'Book returned to public inventory.',
-                    'warning',
+                changes.on_commit(lambda: SystemLog.add(
+                    'Expired Reservation - Public Return',
+                    f'Book "{book.title}" returned to public inventory after expiration '
+                    f'(queue empty).',
+                    'info',
                     None
-                )
-        else:
-            # No one waiting - return to public
-            book.update_available_copies(1)
-            SystemLog.add(
-                'Expired Reservation - Public Return',
-                f'Book "{book.title}" returned to public inventory after expiration '
-                f'(queue empty).',
-                'info',
-                None
-            )
+                ))
         
-        db.commit()
         return True, "Reservation marked as expired"
 
     @staticmethod
-    def auto_expire_reservations():
+    def auto_expire_reservations() -> int:
+        """Expire every ready reservation whose hold has run out.
+        
+        Works in chunks of Config.EXPIRY_BATCH_SIZE. Each chunk is one
+        UPDATE ... RETURNING, and the held copies are passed on per book
+        with ``release_copies`` (next in queue first, otherwise public),
+        all in one commit.
+        
+        Returns:
+            Number of reservations expired.
+        """
         db = get_db()
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        expired_rows = db.execute('''
-            SELECT id FROM reservations 
-            WHERE status = 'ready' AND hold_until < ?
-        ''', (now,)).fetchall()
+        batch_size = Config.EXPIRY_BATCH_SIZE
         
         count = 0
-        for row in expired_rows:
-            res = Reservation.get_by_id(row['id'])
-            if res:
-                success, _ = res.mark_expired()
-                if success:
-                    count += 1
-        return count
+        while True:
+            with Book.batch_updates():
+                rows = db.execute('''
+                    UPDATE reservations SET status = 'expired'
+                    WHERE id IN (
+                        SELECT id FROM reservations
+                        WHERE status = 'ready' AND hold_until < ?
+                        LIMIT ?
+                    )
+                    RETURNING book_id
+                ''', (now, batch_size)).fetchall()
+                
+                expired_per_book = Counter(row['book_id'] for row in rows)
+                books = Book.get_by_ids(expired_per_book)
+                for book_id, expired in expired_per_book.items():
+                    if book_id in books:
+                        Reservation.release_copies(books[book_id], expired)
+            
+            count += len(rows)
+            if len(rows) < batch_size:
+                return count
 
     def complete(self) -> Tuple[bool, str]:
         """Mark reservation as completed (book borrowed).
@@ -442,9 +579,22 @@ class Reservation:
         from models.user import User
         return User.get_by_id(self.user_id)
     
-    def get_queue_position(self) -> int:
-        """Get current position in the queue."""
-        return self.queue_position
+    def get_queue_position(self) -> Optional[int]:
+        """Get the exact current position in the queue.
+        
+        Returns:
+            1-based rank among the book's waiting reservations, or None if
+            this reservation is no longer waiting.
+        """
+        if self.status != 'waiting':
+            return None
+        if self._queue_rank is None:
+            db = get_db()
+            self._queue_rank = db.execute('''
+                SELECT COUNT(*) FROM reservations
+                WHERE book_id = ? AND status = 'waiting' AND queue_position < ?
+            ''', (self.book_id, self.queue_position)).fetchone()[0] + 1
+        return self._queue_rank
     
     def to_dict(self) -> dict:
         """Convert reservation to dictionary."""
@@ -459,5 +609,5 @@ class Reservation:
             'status': self.status,
             'notified_date': self.notified_date,
             'hold_until': self.hold_until,
-            'queue_position': self.queue_position
+            'queue_position': self.get_queue_position()
         }
\ No newline at end of file
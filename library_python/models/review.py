@@ -36,9 +36,11 @@ class Review:
         from models.user import User
         from models.book import Book
         
-        if not User.get_by_id(user_id):
+        user = User.get_by_id(user_id)
+        if not user:
             return None, "Invalid user"
-        if not Book.get_by_id(book_id):
+        book = Book.get_by_id(book_id)
+        if not book:
             return None, "Book not found"
             
         # Check if user already reviewed this book
@@ -66,26 +68,22 @@ class Review:
                 INSERT INTO reviews (id, user_id, book_id, rating, comment, date)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (review_id, user_id, book_id, rating, comment, date))
-            db.commit()
 
-            # Automatically update book rating
-            book = Book.get_by_id(book_id)
-            if book:
-                book.update_rating()
-                
+            # Refresh the book rating and commit both together
+            Review.update_book_rating(book_id)
+
             # Log action
             from models.system_log import SystemLog
-            user = User.get_by_id(user_id)
-            if user and book:
-                SystemLog.add(
-                    'Book Review',
-                    f'{user.name} reviewed "{book.title}" with {rating} stars',
-                    'info',
-                    user_id
-                )
+            SystemLog.add(
+                'Book Review',
+                f'{user.name} reviewed "{book.title}" with {rating} stars',
+                'info',
+                user_id
+            )
 
             return Review.get_by_id(review_id), "Review submitted successfully"
         except Exception as e:
+            db.rollback()
             print(f"Error creating review: {e}")
             return None, "Failed to submit review"
     
@@ -119,6 +117,58 @@ class Review:
         
         return [Review(**dict(row)) for row in rows]
     
+    @staticmethod
+    def get_page(book_id: str, page: int = 1,
+                 per_page: int = 20) -> Tuple[List['Review'], bool]:
+        """Get one page of a book's reviews, newest first.
+
+        Returns:
+            Tuple of (reviews, has_more).
+        """
+        db = get_db()
+        rows = db.execute('''
+            SELECT * FROM reviews
+            WHERE book_id = ?
+            ORDER BY date DESC, id
+            LIMIT ? OFFSET ?
+        ''', (book_id, per_page + 1, (max(page, 1) - 1) * per_page)).fetchall()
+
+        return [Review(**dict(row)) for row in rows[:per_page]], len(rows) > per_page
+
+    @staticmethod
+    def to_dicts(reviews: List['Review']) -> List[dict]:
+        """Serialise many reviews, loading their authors in one query."""
+        from models.user import User
+        users = User.get_by_ids(r.user_id for r in reviews)
+        return [review.to_dict(users.get(review.user_id)) for review in reviews]
+
+    @staticmethod
+    def get_rating_stats(book_id: str) -> dict:
+        """Get a book's average rating, review count and star distribution.
+
+        Reads the book_ratings row maintained by triggers on reviews, so the
+        cost does not grow with the number of reviews.
+
+        Returns:
+            Dictionary with average, count and distribution ({star: count}).
+        """
+        db = get_db()
+        row = db.execute(
+            'SELECT * FROM book_ratings WHERE book_id = ?', (book_id,)
+        ).fetchone()
+
+        if not row or not row['rating_count']:
+            return {
+                'average': 0,
+                'count': 0,
+                'distribution': {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+            }
+        return {
+            'average': round(row['rating_sum'] / row['rating_count'], 1),
+            'count': row['rating_count'],
+            'distribution': {i: row[f'stars_{i}'] for i in range(1, 6)}
+        }
+
     @staticmethod
     def get_by_user(user_id):
         """Get all reviews by a user"""
@@ -143,25 +193,33 @@ class Review:
         return row is not None
     
     @staticmethod
-    def update_book_rating(book_id):
-        """Recalculate and update book's average rating"""
+    def update_book_rating(book_id: str) -> Optional[float]:
+        """Copy a book's average rating from its review totals and commit.
+
+        Uses the book_ratings row instead of re-averaging every review. A
+        book whose last review was removed keeps its previous rating.
+
+        Returns:
+            The new rating, or None if the book has no reviews.
+        """
         db = get_db()
-        
-        # Calculate average rating
         row = db.execute('''
-            SELECT AVG(rating) as avg_rating, COUNT(*) as count
-            FROM reviews 
-            WHERE book_id = ?
-        ''', (book_id,)).fetchone()
-        
-        if row and row['count'] > 0:
-            avg_rating = round(row['avg_rating'], 1)
-            db.execute('''
-                UPDATE books 
-                SET rating = ? 
-                WHERE id = ?
-            ''', (avg_rating, book_id))
-            db.commit()
+            UPDATE books
+            SET rating = (
+                SELECT ROUND(CAST(rating_sum AS REAL) / rating_count, 1)
+                FROM book_ratings WHERE book_id = books.id
+            )
+            WHERE id = ? AND EXISTS (
+                SELECT 1 FROM book_ratings WHERE book_id = ? AND rating_count > 0
+            )
+            RETURNING rating
+        ''', (book_id, book_id)).fetchone()
+        db.commit()
+
+        from models.book import shelf_cache
+        shelf_cache.invalidate('top_rated')
+        shelf_cache.invalidate_book(book_id)
+        return row['rating'] if row else None
     
     @staticmethod
     def delete(review_id):
@@ -176,9 +234,8 @@ class Review:
         book_id = review.book_id
         
         db.execute('DELETE FROM reviews WHERE id = ?', (review_id,))
-        db.commit()
         
-        # Update book rating
+        # Update book rating and commit the deletion with it
         Review.update_book_rating(book_id)
         
         return True, "Review deleted successfully"
@@ -201,13 +258,9 @@ class Review:
             SET rating = ?, comment = ?
             WHERE id = ?
         ''', (rating, comment, self.id))
-        db.commit()
 
-        # Automatically update book rating
-        from models.book import Book
-        book = Book.get_by_id(self.book_id)
-        if book:
-            book.update_rating()
+        # Automatically update book rating, committed with the review
+        Review.update_book_rating(self.book_id)
 
         return True, "Review updated successfully"
 
@@ -216,9 +269,9 @@ class Review:
         from models.user import User
         return User.get_by_id(self.user_id)
 
-    def to_dict(self):
+    def to_dict(self, user=None):
         """Convert review to dictionary"""
-        user = self.get_user()
+        user = user or self.get_user()
         
         return {
             'id': self.id,
@@ -3,6 +3,7 @@ from models.book import Book
 from models.borrow import Borrow
 from models.database import get_db
 from models.fine import Fine
+from models.library_stats import LibraryStats
 from models.system_log import SystemLog
 from models.user import User
 
@@ -216,19 +217,14 @@ class Staff(User):
         Returns:
             Dictionary containing dashboard statistics.
         """
-        db = get_db()
-
-        # Get total debt from users table
-        total_debt_row = db.execute(
-            'SELECT SUM(fines) as total FROM users'
-        ).fetchone()
-        total_debt = total_debt_row['total'] or 0.0
+        totals = LibraryStats.get()
 
         stats = {
-            'borrowed': Borrow.get_active_borrows_count(),
-            'overdue': Borrow.get_overdue_count(),
-            'fines': total_debt,
-            'members': User.get_total_users(),
+            'borrowed': totals['active_borrows'],
+            'overdue': totals['overdue_count'],
+            'fines': totals['total_fines'],
+            'debtors': totals['debtor_count'],
+            'members': totals['total_users'],
             'unread_messages': 0
         }
 
@@ -1,14 +1,23 @@
 import json
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
+from flask import g
 from models.database import get_db
 from config.config import Config
 
+# Process-wide cache: (version, config). Version 0 means "no row yet".
+_cache: Tuple[Optional[int], Dict[str, Any]] = (None, {})
+
 
 class SystemConfig:
     """System configuration settings manager.
     
     Manages dynamic configuration stored in the database.
     Falls back to Config.py constants if DB values are missing.
+
+    The parsed config is cached per process and keyed by the row's
+    ``version`` column, which update() bumps. Each request checks the
+    version once (a primary-key lookup) and then serves every read from
+    memory, so changes made by other workers are seen on their next request.
     """
 
     DEFAULT_CONFIG: Dict[str, Any] = {
@@ -20,9 +29,29 @@ class SystemConfig:
     }
 
     @staticmethod
-    def get() -> Dict[str, Any]:
-        """Get current system configuration from DB."""
+    def _load() -> Dict[str, Any]:
+        """Get the cached config for this request, reloading if it changed."""
+        global _cache
+
+        config = g.get('_system_config')
+        if config is not None:
+            return config
+
         db = get_db()
+        row = db.execute('SELECT version FROM system_config WHERE id = 1').fetchone()
+        version = row['version'] if row else 0
+
+        cached_version, config = _cache
+        if cached_version != version:
+            config = SystemConfig._read(db)
+            _cache = (version, config)
+
+        g._system_config = config
+        return config
+
+    @staticmethod
+    def _read(db) -> Dict[str, Any]:
+        """Read and parse the config row from the database."""
         result = db.execute('SELECT config_data FROM system_config WHERE id = 1').fetchone()
         
         if result:
@@ -32,10 +61,15 @@ class SystemConfig:
                 return SystemConfig.DEFAULT_CONFIG.copy()
         return SystemConfig.DEFAULT_CONFIG.copy()
 
+    @staticmethod
+    def get() -> Dict[str, Any]:
+        """Get current system configuration (a copy, safe to modify)."""
+        return dict(SystemConfig._load())
+
     @staticmethod
     def get_value(key: str, default: Any = None, type_cast: type = str) -> Any:
-        """Helper: Get specific config value from DB, fallback to provided default."""
-        current_config = SystemConfig.get()
+        """Helper: Get specific config value, fallback to provided default."""
+        current_config = SystemConfig._load()
         
         if key in current_config:
             val = current_config[key]
@@ -60,10 +94,12 @@ class SystemConfig:
 
     @staticmethod
     def update(config_data: Dict[str, Any]) -> bool:
-        """Update system configuration in DB."""
+        """Update system configuration in DB and bump its version."""
+        global _cache
+
         db = get_db()
         
-        current_config = SystemConfig.get()
+        current_config = SystemConfig._read(db)
         current_config.update(config_data)
         
         config_json = json.dumps(current_config)
@@ -71,9 +107,19 @@ class SystemConfig:
         result = db.execute('SELECT id FROM system_config WHERE id = 1').fetchone()
 
         if result:
-            db.execute('UPDATE system_config SET config_data = ? WHERE id = 1', (config_json,))
+            db.execute(
+                'UPDATE system_config SET config_data = ?, version = version + 1 WHERE id = 1',
+                (config_json,)
+            )
         else:
-            db.execute('INSERT INTO system_config (id, config_data) VALUES (1, ?)', (config_json,))
+            db.execute(
+                'INSERT INTO system_config (id, config_data, version) VALUES (1, ?, 1)',
+                (config_json,)
+            )
 
+        version = db.execute('SELECT version FROM system_config WHERE id = 1').fetchone()['version']
         db.commit()
-        return True
\ No newline at end of file
+
+        _cache = (version, current_config)
+        g._system_config = current_config
+        return True
@@ -1,7 +1,147 @@
+import logging
+import queue
+import threading
+import time
 import uuid
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
-from models.database import get_db
+from typing import Any, Dict, List, Optional, Tuple
+from flask import g, has_app_context
+from config.config import Config
+from models.database import get_db, get_pool
+
+logger = logging.getLogger(__name__)
+
+LogEntry = Tuple[str, str, str, str, str, Optional[str]]
+
+
+class LogWriter:
+    """Background writer that batches system log inserts.
+
+    SystemLog.add() puts entries on a bounded queue; a daemon thread
+    writes them with executemany in one transaction per batch, flushing
+    when ``batch_size`` entries are waiting or ``flush_interval`` seconds
+    have passed. If the queue is full the caller writes synchronously
+    instead of dropping the entry. Readers never wait for the queue, so
+    entries can take up to ``flush_interval`` seconds to appear.
+    """
+
+    def __init__(self, queue_size: int, batch_size: int,
+                 flush_interval: float) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the writer thread."""
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name='system-log-writer', daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, entry: LogEntry) -> bool:
+        """Queue an entry; returns False if the queue is full or stopped."""
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            return False
+
+    def stop(self) -> None:
+        """Stop the thread and write whatever is still queued."""
+        if not self.running:
+            return
+        self._stopping.set()
+        self._thread.join(timeout=self.flush_interval + 5)
+        self._thread = None
+        self._write(self._drain())
+
+    def _drain(self) -> List[LogEntry]:
+        """Take everything currently queued without blocking."""
+        entries = []
+        while True:
+            try:
+                entries.append(self._queue.get_nowait())
+            except queue.Empty:
+                return entries
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._write(batch)
+
+    @staticmethod
+    def _write(entries: List[LogEntry]) -> None:
+        """Insert a batch of entries in a single transaction."""
+        if not entries:
+            return
+        pool = get_pool()
+        conn = pool.acquire()
+        try:
+            conn.executemany('''
+                INSERT INTO system_logs (id, timestamp, action, details, log_type, user_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', entries)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to write {len(entries)} system log(s): {e}")
+        finally:
+            pool.release(conn)
+
+
+_writer = LogWriter(
+    queue_size=Config.LOG_QUEUE_SIZE,
+    batch_size=Config.LOG_BATCH_SIZE,
+    flush_interval=Config.LOG_FLUSH_INTERVAL_SECONDS
+)
+
+
+def start_log_writer() -> None:
+    """Start background log writing (no-op when LOG_WRITER_ASYNC is off)."""
+    if Config.LOG_WRITER_ASYNC:
+        _writer.start()
+
+
+def stop_log_writer() -> None:
+    """Flush pending log entries and stop the background writer."""
+    _writer.stop()
+
+
+def write_deferred_logs(e=None) -> None:
+    """Write entries held back while the request connection was writing.
+
+    Registered as an app-context teardown that runs after close_db(), once
+    the connection and its write lock are back in the pool.
+    """
+    entries = g.pop('_deferred_logs', None) if has_app_context() else None
+    if entries:
+        LogWriter._write(entries)
 
 
 class SystemLog:
@@ -16,6 +156,13 @@ class SystemLog:
             user_id: Optional[str] = None) -> str:
         """Add a new system log entry.
 
+        The entry is handed to the background writer when it is running,
+        so callers do not wait for the insert or its commit. Otherwise
+        (tests, scripts, full queue) it is written synchronously on a
+        pooled connection of its own, never committing the caller's
+        transaction. While the request connection holds the write lock the
+        entry is kept until that transaction ends or the context tears down.
+
         Args:
             action: The action being logged.
             details: Detailed description of the action.
@@ -25,15 +172,25 @@ class SystemLog:
         Returns:
             The ID of the created log entry.
         """
-        db = get_db()
         log_id = str(uuid.uuid4())
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        db.execute('''
-            INSERT INTO system_logs (id, timestamp, action, details, log_type, user_id)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (log_id, timestamp, action, details, log_type, user_id))
-        db.commit()
+        entry = (log_id, timestamp, action, details, log_type, user_id)
+
+        if _writer.submit(entry):
+            return log_id
+
+        if not has_app_context():
+            LogWriter._write([entry])
+            return log_id
+
+        # Writing on another connection while this one holds the write lock
+        # would wait out the busy timeout, so hold the entry back until then
+        deferred = g.setdefault('_deferred_logs', [])
+        deferred.append(entry)
+        db = g.get('db')
+        if db is None or not db.in_transaction:
+            g.pop('_deferred_logs')
+            LogWriter._write(deferred)
         return log_id
 
     @staticmethod
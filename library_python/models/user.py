@@ -1,12 +1,78 @@
-import json
+import copy
+import threading
+import time
 import uuid
 from datetime import datetime
 from typing import Optional, List, Dict, Any, Tuple
+from flask import g
+from config.config import Config
 from models.book import Book
 from werkzeug.security import check_password_hash, generate_password_hash
 from models.database import get_db
 from models.guest import Guest
 
+
+class UserCache:
+    """Short-lived in-memory cache of users loaded by ID.
+    
+    Saves the users query on every request.
+    Entries expire after ``ttl`` seconds and are dropped as soon as this
+    process changes the user; at most ``size`` users are kept. Callers
+    always get their own copy.
+    
+    Every invalidation bumps a generation counter. A user loaded before
+    the latest invalidation is not cached, so a slow reader cannot put
+    back a row that another thread has just changed.
+    """
+    
+    def __init__(self, ttl: float, size: int) -> None:
+        self.ttl = ttl
+        self.size = size
+        self._lock = threading.Lock()
+        self._users: Dict[str, Tuple[float, 'User']] = {}
+        self._generation = 0
+    
+    @staticmethod
+    def _copy(user: 'User') -> 'User':
+        user = copy.copy(user)
+        # Favorites are not cached; each copy loads them on first use
+        user._favorites = None
+        return user
+    
+    def get(self, user_id: str) -> Optional['User']:
+        """Get a copy of the cached user, or None if missing or expired."""
+        entry = self._users.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return self._copy(entry[1])
+    
+    def generation(self) -> int:
+        """Current generation; read it before loading a user to cache."""
+        return self._generation
+    
+    def put(self, user: 'User', generation: int) -> None:
+        """Cache a copy of the user, evicting the oldest entry if full.
+        
+        Skipped if anything was invalidated since ``generation`` was read.
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._users.pop(user.id, None)
+            if len(self._users) >= self.size:
+                self._users.pop(next(iter(self._users)))
+            self._users[user.id] = (time.monotonic() + self.ttl, self._copy(user))
+    
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        """Drop one user, or every user if no ID is given."""
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+
 class User:
     @staticmethod
     def get_users_with_debt():
@@ -17,20 +83,29 @@ class User:
         ).fetchall()
         return [get_user_by_role(dict(r)) for r in rows]
 
-    def __init__(self, id, email, name, role, fines, favorites, **kwargs):
+    @staticmethod
+    def get_debtors_page(page: int = 1, per_page: int = 20) -> Tuple[List['User'], bool]:
+        """Get one page of users with outstanding fines, largest debt first.
+
+        Returns:
+            Tuple of (users, has_more).
+        """
+        db = get_db()
+        rows = db.execute(
+            'SELECT * FROM users WHERE fines > 0 ORDER BY fines DESC, id LIMIT ? OFFSET ?',
+            (per_page + 1, (max(page, 1) - 1) * per_page)
+        ).fetchall()
+        return [get_user_by_role(dict(r)) for r in rows[:per_page]], len(rows) > per_page
+
+    def __init__(self, id, email, name, role, fines, favorites=None, **kwargs):
         self.id = id
         self.email = email
         self.name = name
         self.role = role
         self.fines = float(fines) if fines is not None else 0.0
-        if isinstance(favorites, str):
-            try:
-                self.favorites = json.loads(favorites)
-            except:
-                self.favorites = []
-        else:
-            self.favorites = favorites if favorites else []
-            
+        # Favorites live in user_favorites and are loaded on first use; the
+        # legacy users.favorites JSON column is ignored
+        self._favorites: Optional[List[str]] = None
         self.phone = kwargs.get('phone')
         self.birthday = kwargs.get('birthday')
         self.member_since = kwargs.get('member_since')
@@ -48,15 +123,77 @@ class User:
 
     @staticmethod
     def get_by_id(user_id: str) -> Optional['User']:
-        """Factory Method: Get User, Staff, or Admin instance by ID."""
+        """Factory Method: Get User, Staff, or Admin instance by ID.
+        
+        Repeated calls in one request return the same object. Across
+        requests the user comes from ``user_cache`` when fresh.
+        """
+        identity_map = g.setdefault('_users', {})
+        user = identity_map.get(user_id)
+        if user is not None:
+            return user
+        
+        user = user_cache.get(user_id)
+        if user is None:
+            generation = user_cache.generation()
+            db = get_db()
+            row = db.execute(
+                'SELECT * FROM users WHERE id = ?',
+                (user_id,)
+            ).fetchone()
+            if not row:
+                return None
+            user = get_user_by_role(dict(row))
+            user_cache.put(user, generation)
+        
+        identity_map[user_id] = user
+        return user
+
+    @staticmethod
+    def invalidate_cache(user_id: str) -> None:
+        """Forget cached copies of a user after its row changed.
+        
+        Call after the change is committed.
+        """
+        user_cache.invalidate(user_id)
+        g.get('_users', {}).pop(user_id, None)
+
+    @staticmethod
+    def get_by_ids(user_ids) -> Dict[str, 'User']:
+        """Get many users (as User/Staff/Admin) in one query per chunk of IDs."""
+        from models.database import MAX_SQL_PARAMS
         db = get_db()
-        row = db.execute(
-            'SELECT * FROM users WHERE id = ?',
-            (user_id,)
-        ).fetchone()
+        ids = list(dict.fromkeys(user_ids))
+        users = {}
+        for start in range(0, len(ids), MAX_SQL_PARAMS):
+            chunk = ids[start:start + MAX_SQL_PARAMS]
+            placeholders = ', '.join('?' for _ in chunk)
+            rows = db.execute(
+                f'SELECT * FROM users WHERE id IN ({placeholders})',
+                chunk
+            ).fetchall()
+            for row in rows:
+                users[row['id']] = get_user_by_role(dict(row))
+        return users
+
+    @staticmethod
+    def get_unread_counts(user_id: str) -> Tuple[int, int]:
+        """Get unread chat messages and notifications in one lookup.
+        
+        Reads the user_counters row maintained by triggers on
+        chat_messages and notifications.
+        
+        Returns:
+            Tuple of (unread messages, unread notifications).
+        """
+        db = get_db()
+        row = db.execute('''
+            SELECT unread_messages, unread_notifications
+            FROM user_counters WHERE user_id = ?
+        ''', (user_id,)).fetchone()
         if not row:
-            return None
-        return get_user_by_role(dict(row))
+            return 0, 0
+        return row['unread_messages'], row['unread_notifications']
 
     @staticmethod
     def get_by_email(email: str) -> Optional['User']:
@@ -120,6 +257,7 @@ class User:
                 (self.name, self.phone, self.birthday, self.id)
             )
             db.commit()
+            User.invalidate_cache(self.id)
             return True, "Profile updated successfully"
         except Exception as e:
             return False, f"Failed to update profile: {str(e)}"
@@ -135,19 +273,24 @@ class User:
         
         ✅ FIXED: Now updates violations_history status to 'paid'
         """
+        db = get_db()
+        # This object may have been cached; go by the stored balance
+        self.fines = db.execute(
+            'SELECT fines FROM users WHERE id = ?', (self.id,)
+        ).fetchone()['fines']
         if amount <= 0 or self.fines <= 0:
             return False, "No fines to pay or invalid amount"
 
         pay_amount = min(self.fines, float(amount))
-        self.fines -= pay_amount
 
-        db = get_db()
         try:
-            # 1. Update user fine balance
-            db.execute(
-                'UPDATE users SET fines = ? WHERE id = ?',
-                (self.fines, self.id)
-            )
+            # 1. Update user fine balance relative to the stored value, so a
+            # fine added meanwhile is not overwritten
+            row = db.execute(
+                'UPDATE users SET fines = MAX(0, fines - ?) WHERE id = ? RETURNING fines',
+                (pay_amount, self.id)
+            ).fetchone()
+            self.fines = row['fines']
 
             # 2. Update violations_history to mark as paid
             # Update violation records associated with this user to 'paid' status
@@ -162,6 +305,7 @@ class User:
                 self.unlock()
 
             db.commit()
+            User.invalidate_cache(self.id)
             return True, f"Paid {pay_amount:,.0f} VND. Remaining: {self.fines:,.0f} VND"
         except Exception as e:
             db.rollback()
@@ -173,6 +317,7 @@ class User:
         db = get_db()
         db.execute('UPDATE users SET is_locked = 1 WHERE id = ?', (self.id,))
         db.commit()
+        User.invalidate_cache(self.id)
 
     def unlock(self) -> None:
         """Unlock user account."""
@@ -180,6 +325,7 @@ class User:
         db = get_db()
         db.execute('UPDATE users SET is_locked = 0 WHERE id = ?', (self.id,))
         db.commit()
+        User.invalidate_cache(self.id)
 
     def reset_password(self, new_password: str) -> Tuple[bool, str]:
         """Reset user password."""
@@ -193,26 +339,45 @@ class User:
                 (hashed_password, self.id)
             )
             db.commit()
+            User.invalidate_cache(self.id)
             return True, "Password reset successful"
         except Exception as e:
             return False, f"Password reset failed: {str(e)}"
 
-    def add_fine(self, amount: float) -> None:
-        """Add fine amount to user account."""
-        self.fines += float(amount)
+    def add_fine(self, amount: float, commit: bool = True) -> None:
+        """Add fine amount to user account.
+
+        Args:
+            amount: Amount to add (VND).
+            commit: If False, the change is left in the caller's transaction;
+                the caller commits and then calls User.invalidate_cache.
+        """
         db = get_db()
-        db.execute('UPDATE users SET fines = ? WHERE id = ?', (self.fines, self.id))
-        db.commit()
+        row = db.execute(
+            'UPDATE users SET fines = fines + ? WHERE id = ? RETURNING fines',
+            (float(amount), self.id)
+        ).fetchone()
+        self.fines = row['fines']
+        if commit:
+            db.commit()
+            User.invalidate_cache(self.id)
+
+    def add_violation(self, commit: bool = True) -> None:
+        """Increment violation count for user.
 
-    def add_violation(self) -> None:
-        """Increment violation count for user."""
-        self.violations += 1
+        Args:
+            commit: If False, the change is left in the caller's transaction;
+                the caller commits and then calls User.invalidate_cache.
+        """
         db = get_db()
-        db.execute(
-            'UPDATE users SET violations = ? WHERE id = ?',
-            (self.violations, self.id)
-        )
-        db.commit()
+        row = db.execute(
+            'UPDATE users SET violations = violations + 1 WHERE id = ? RETURNING violations',
+            (self.id,)
+        ).fetchone()
+        self.violations = row['violations']
+        if commit:
+            db.commit()
+            User.invalidate_cache(self.id)
 
     def can_manage_borrows(self) -> bool:
         """Check if user can manage borrows (staff or admin)."""
@@ -226,36 +391,70 @@ class User:
         """Check if user is staff or admin."""
         return self.role in ['staff', 'admin']
     
+    @property
+    def favorites(self) -> List[str]:
+        """IDs of the user's favorite books, in the order they were added."""
+        if self._favorites is None:
+            db = get_db()
+            rows = db.execute('''
+                SELECT book_id FROM user_favorites
+                WHERE user_id = ? ORDER BY added_at, rowid
+            ''', (self.id,)).fetchall()
+            self._favorites = [row['book_id'] for row in rows]
+        return self._favorites
+
+    def is_favorite(self, book_id: str) -> bool:
+        """Check whether a book is in the user's favorites."""
+        if self._favorites is not None:
+            return book_id in self._favorites
+        db = get_db()
+        row = db.execute(
+            'SELECT 1 FROM user_favorites WHERE user_id = ? AND book_id = ?',
+            (self.id, book_id)
+        ).fetchone()
+        return row is not None
+
     def get_favorite_books(self) -> List['Book']:
-        """Get list of favorite books."""
-        from models.book import Book
-        return [Book.get_by_id(bid) for bid in self.favorites
-                if Book.get_by_id(bid)]
+        """Get list of favorite books in one query."""
+        db = get_db()
+        rows = db.execute('''
+            SELECT b.id, b.title, b.author, b.category, b.publisher, b.year,
+                   b.language, b.isbn, b.description, b.cover_url, b.total_copies,
+                   b.available_copies, b.shelf_location, b.rating, b.borrow_count
+            FROM user_favorites f
+            JOIN books b ON b.id = f.book_id
+            WHERE f.user_id = ?
+            ORDER BY f.added_at, f.rowid
+        ''', (self.id,)).fetchall()
+        return [Book(**dict(row)) for row in rows]
 
     def add_favorite(self, book_id: str) -> bool:
         """Add book to favorites."""
-        if book_id not in self.favorites:
-            self.favorites.append(book_id)
-            self._save_favorites()
-            return True
-        return False
+        db = get_db()
+        cursor = db.execute(
+            'INSERT OR IGNORE INTO user_favorites (user_id, book_id, added_at) VALUES (?, ?, ?)',
+            (self.id, book_id, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        )
+        db.commit()
+        if not cursor.rowcount:
+            return False
+        if self._favorites is not None:
+            self._favorites.append(book_id)
+        return True
 
     def remove_favorite(self, book_id: str) -> bool:
         """Remove book from favorites."""
-        if book_id in self.favorites:
-            self.favorites.remove(book_id)
-            self._save_favorites()
-            return True
-        return False
-
-    def _save_favorites(self) -> None:
-        """Save favorites to database."""
         db = get_db()
-        db.execute(
-            'UPDATE users SET favorites = ? WHERE id = ?',
-            (json.dumps(self.favorites), self.id)
+        cursor = db.execute(
+            'DELETE FROM user_favorites WHERE user_id = ? AND book_id = ?',
+            (self.id, book_id)
         )
         db.commit()
+        if not cursor.rowcount:
+            return False
+        if self._favorites is not None:
+            self._favorites.remove(book_id)
+        return True
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert user to dictionary."""
@@ -296,42 +495,57 @@ class User:
         """
         Check the entire interaction status between User and Book.
         Return a dict containing all necessary flags for the template.
+
+        Favorite, borrow, reservation and review state for this (user, book) pair
+        come from one query of EXISTS subqueries on indexed columns, so the
+        cost does not depend on how many borrows, reservations or reviews
+        exist.
         """
-        from models.borrow import Borrow
         from models.review import Review
-        # from models.reservation import Reservation (Not used directly here but implied)
+
+        db = get_db()
+        row = db.execute('''
+            SELECT
+                EXISTS (SELECT 1 FROM user_favorites
+                        WHERE user_id = :user_id AND book_id = :book_id) AS is_favorite,
+                EXISTS (SELECT 1 FROM borrows
+                        WHERE user_id = :user_id AND book_id = :book_id
+                          AND status IN ('borrowed', 'pending_pickup')) AS is_borrowed,
+                EXISTS (SELECT 1 FROM reservations
+                        WHERE user_id = :user_id AND book_id = :book_id
+                          AND status = 'waiting') AS is_reserved,
+                (SELECT status FROM reservations
+                 WHERE user_id = :user_id AND book_id = :book_id
+                 ORDER BY reservation_date DESC LIMIT 1) AS reservation_status,
+                rv.id AS review_id, rv.rating AS review_rating,
+                rv.comment AS review_comment, rv.date AS review_date
+            FROM (SELECT 1)
+            LEFT JOIN reviews rv ON rv.user_id = :user_id AND rv.book_id = :book_id
+            LIMIT 1
+        ''', {'user_id': self.id, 'book_id': book_id}).fetchone()
 
         status = {
-            'is_favorite': book_id in self.favorites,
+            'is_favorite': bool(row['is_favorite']),
             'can_borrow': False,
             'can_reserve': False,
-            'is_borrowed': False,
-            'is_reserved': False,
-            'can_review': False,
-            'user_review': None
+            'is_borrowed': bool(row['is_borrowed']),
+            'is_reserved': bool(row['is_reserved']),
+            'can_review': row['review_id'] is None,
+            'user_review': None,
+            # Status of the latest reservation of this book, if any
+            'reservation_status': row['reservation_status']
         }
 
-        active_borrows = Borrow.get_active_borrows(self.id)
-        reserved_books = Borrow.get_user_reserved_books(self.id)
-
-        status['is_borrowed'] = any(b.book_id == book_id for b in active_borrows)
-        status['is_reserved'] = any(r.book_id == book_id for r in reserved_books)
-
         if not status['is_borrowed'] and not status['is_reserved'] and book_obj:
             if book_obj.available_copies > 0:
                 status['can_borrow'] = True
             else:
                 status['can_reserve'] = True
 
-        reviews = Review.get_by_book(book_id)
-        status['can_review'] = not any(r.user_id == self.id for r in reviews)
-
         if not status['can_review']:
-            my_reviews = [r for r in reviews if r.user_id == self.id]
-            # Convert object to dict for template if needed, or keep object
-            # Original code expected dict from 'get_book_reviews_with_details'
-            # Here we provide the object, template should handle 'r.comment' etc.
-            status['user_review'] = my_reviews[0].to_dict() if my_reviews else None
+            review = Review(row['review_id'], self.id, book_id, row['review_rating'],
+                            row['review_comment'], row['review_date'])
+            status['user_review'] = review.to_dict(self)
 
         return status
 
@@ -356,4 +570,8 @@ def get_user_by_role(row_data: dict) -> User:
         Staff = _get_staff_class()
         return Staff(**row_data)
     else:
-        return User(**row_data)
\ No newline at end of file
+        return User(**row_data)
+
+
+# Shared by all requests in this process
+user_cache = UserCache(Config.USER_CACHE_TTL_SECONDS, Config.USER_CACHE_SIZE)
@@ -1,7 +1,9 @@
 import csv
 from io import StringIO
-from flask import Blueprint, flash, make_response, redirect, render_template, request, session, url_for
+from flask import Blueprint, flash, jsonify, make_response, redirect, render_template, request, session, url_for
 from models.admin import Admin
+from models.database import get_pool_stats
+from models.job_run import JobRun
 from models.system_config import SystemConfig
 from models.system_log import SystemLog
 from utils.decorators import login_required, role_required
@@ -22,6 +24,8 @@ def dashboard():
         stats=admin.get_stats(),
         config=SystemConfig.get(),
         logs=SystemLog.get_recent(50),
+        job_summary=JobRun.get_summary(),
+        job_runs=JobRun.get_recent(50),
         trends=[]
     )
 
@@ -75,8 +79,6 @@ def send_notifications():
 @role_required('admin')
 def list_notification_templates():
     """Get list of notification templates."""
-    from flask import jsonify
-    
     templates = [
         {
             'id': 'overdue_reminder',
@@ -121,6 +123,17 @@ def list_notification_templates():
     })
 
 
+@admin_bp.route('/pool-stats', methods=['GET'])
+@login_required
+@role_required('admin')
+def pool_stats():
+    """Get database connection pool statistics."""
+    return jsonify({
+        'success': True,
+        'pool': get_pool_stats()
+    })
+
+
 @admin_bp.route('/logs/export')
 @login_required
 @role_required('admin')
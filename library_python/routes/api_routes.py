@@ -12,28 +12,64 @@ from utils.decorators import login_required, role_required
 # Create API blueprint
 api_bp = Blueprint('api', __name__)
 
+# Page sizes for /api/books
+BOOKS_PAGE_SIZE = 20
+BOOKS_MAX_PAGE_SIZE = 100
+
 
 # ==================== Book Operations ====================
 
 @api_bp.route('/books', methods=['GET'])
 def get_books():
-    """Search books via API.
+    """Search books via API, one page at a time.
     
     Query params:
         q: Search query.
         searchBy: Field to search (title, author, category).
+        sort: Sort order (relevance, title, author, year, rating, popular, new).
+        category: Filter by category.
+        limit: Page size (default 20, max 100).
+        cursor: Cursor from the previous page's next_cursor.
+        include_total: If '1', also return a bounded match count.
     
     Returns:
-        JSON response with book list.
+        JSON response with book list and the cursor for the next page.
     """
     query = request.args.get('q', '')
     search_by = request.args.get('searchBy', 'title')
+    sort_by = request.args.get('sort', 'title')
+    category = request.args.get('category', '')
+    cursor = request.args.get('cursor') or None
+    limit = max(1, min(request.args.get('limit', BOOKS_PAGE_SIZE, type=int),
+                       BOOKS_MAX_PAGE_SIZE))
+    
+    books, next_cursor = Book.search_page(
+        query, search_by, sort_by, category, limit=limit, cursor=cursor
+    )
+    
+    response = {
+        'success': True,
+        'books': [book.to_dict() for book in books],
+        'next_cursor': next_cursor
+    }
+    if request.args.get('include_total') == '1':
+        total, is_estimate = Book.count_search(query, search_by, category)
+        response['total'] = total
+        response['total_is_estimate'] = is_estimate
     
-    books = Book.search(query, search_by)
+    return jsonify(response)
+
+
+@api_bp.route('/books/facets', methods=['GET'])
+def get_book_facets():
+    """Get category facets with live book counts.
     
+    Returns:
+        JSON response with a list of {category, book_count, available_count}.
+    """
     return jsonify({
         'success': True,
-        'books': [book.to_dict() for book in books]
+        'categories': Book.get_category_facets()
     })
 
 
@@ -288,19 +324,19 @@ def send_notification():
     
     try:
         if target == 'all':
-            notifications = Notification.send_to_all_users(notif_type, title, message)
+            sent_count = Notification.send_to_all_users(notif_type, title, message)
             return jsonify({
                 'success': True,
-                'message': f'Sent to {len(notifications)} users'
+                'message': f'Sent to {sent_count} users'
             })
         
         elif target == 'specific' and user_ids:
-            notifications = Notification.send_to_specific_users(
+            sent_count = Notification.send_to_specific_users(
                 user_ids, notif_type, title, message
             )
             return jsonify({
                 'success': True,
-                'message': f'Sent to {len(notifications)} users'
+                'message': f'Sent to {sent_count} users'
             })
         
         return jsonify({
@@ -2,11 +2,16 @@ from flask import Blueprint, flash, g, redirect, render_template, request, url_f
 from models.book import Book
 from models.borrow import Borrow
 from models.review import Review
-from models.reservation import Reservation  
 
 # Create main blueprint
 main_bp = Blueprint('main', __name__)
 
+# Number of books per search results page
+SEARCH_PAGE_SIZE = 40
+
+# Number of reviews per book detail page
+REVIEWS_PAGE_SIZE = 20
+
 
 @main_bp.route('/')
 def home():
@@ -30,8 +35,9 @@ def search():
     Query parameters:
         q: Search query string
         searchBy: Field to search (title, author, category)
-        sort: Sort order (title, author, year, rating, popular, new)
+        sort: Sort order (relevance, title, author, year, rating, popular, new)
         category: Filter by category
+        cursor: Cursor for the next page of results
     
     Returns:
         Rendered search results page.
@@ -40,18 +46,26 @@ def search():
     search_by = request.args.get('searchBy', 'title')
     sort_by = request.args.get('sort', 'title')
     category = request.args.get('category', '')
+    cursor = request.args.get('cursor') or None
     
-    books = Book.search(query, search_by, sort_by, category)
-    categories = Book.get_all_categories()
+    books, next_cursor = Book.search_page(
+        query, search_by, sort_by, category,
+        limit=SEARCH_PAGE_SIZE, cursor=cursor
+    )
+    total, total_is_estimate = Book.count_search(query, search_by, category)
+    category_facets = Book.get_category_facets()
     
     return render_template(
         'pages/search.html',
         books=books,
-        categories=categories,
+        category_facets=category_facets,
         query=query,
         search_by=search_by,
         sort_by=sort_by,
-        selected_category=category
+        selected_category=category,
+        next_cursor=next_cursor,
+        total=total,
+        total_is_estimate=total_is_estimate
     )
 
 
@@ -70,27 +84,11 @@ def book_detail(book_id: str):
         flash('Book not found', 'error')
         return redirect(url_for('main.search'))
 
-    # Get reviews and calculate statistics
-    review_objs = Review.get_by_book(book_id)
-    reviews = [r.to_dict() for r in review_objs]
-    
-    # Calculate rating statistics
-    if review_objs:
-        avg_rating = round(sum(r.rating for r in review_objs) / len(review_objs), 1)
-        distribution = {i: 0 for i in range(1, 6)}
-        for r in review_objs:
-            distribution[r.rating] += 1
-        rating_stats = {
-            'average': avg_rating,
-            'count': len(review_objs),
-            'distribution': distribution
-        }
-    else:
-        rating_stats = {
-            'average': 0,
-            'count': 0,
-            'distribution': {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-        }
+    # One page of reviews; totals come from the precomputed aggregates
+    page = max(1, request.args.get('page', 1, type=int))
+    review_objs, has_more_reviews = Review.get_page(book_id, page, REVIEWS_PAGE_SIZE)
+    reviews = Review.to_dicts(review_objs)
+    rating_stats = Review.get_rating_stats(book_id)
 
     # Default interaction status for guests
     interaction_status = {
@@ -100,33 +98,31 @@ def book_detail(book_id: str):
         'is_borrowed': False,
         'is_reserved': False,
         'can_review': False,
-        'user_review': None
+        'user_review': None,
+        'reservation_status': None
     }
-    
-    # Variable to track reservation status (waiting/ready)
-    user_reservation_status = None
 
     # Get interaction status for logged-in users
     if g.user and hasattr(g.user, 'id') and g.user.id:
-        # Standard status check
+        # Borrow, reservation and review state in one query
         interaction_status = g.user.get_book_interaction_status(book_id, book)
-        
-        # [NEW LOGIC] Check specific reservation status
-        res = Reservation.get_user_book_reservation(g.user.id, book_id)
-        if res:
-            user_reservation_status = res.status
-            
-            # CRITICAL: Override can_borrow if user has a READY reservation
-            # This allows borrowing even if book.available_copies is 0 (Hidden Inventory)
-            if res.status == 'ready':
-                interaction_status['can_borrow'] = True
-                interaction_status['can_reserve'] = False
-                interaction_status['is_reserved'] = False # Hide the "Reserved" button to show "Borrow" instead
+    
+    # Reservation status (waiting/ready) is passed to the template separately
+    user_reservation_status = interaction_status.pop('reservation_status')
+
+    # CRITICAL: Override can_borrow if user has a READY reservation
+    # This allows borrowing even if book.available_copies is 0 (Hidden Inventory)
+    if user_reservation_status == 'ready':
+        interaction_status['can_borrow'] = True
+        interaction_status['can_reserve'] = False
+        interaction_status['is_reserved'] = False # Hide the "Reserved" button to show "Borrow" instead
 
     return render_template(
         'pages/book_detail.html',
         book=book,
         reviews=reviews,
+        review_page=page,
+        has_more_reviews=has_more_reviews,
         rating_stats=rating_stats,
         user_reservation_status=user_reservation_status, # Pass status to template
         **interaction_status
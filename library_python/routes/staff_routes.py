@@ -1,6 +1,7 @@
-from flask import Blueprint, flash, redirect, render_template, request, session, url_for
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, session, url_for
 from models.book import Book
 from models.borrow import Borrow
+from models.library_stats import LibraryStats
 from models.reservation import Reservation
 from models.staff import Staff
 from models.user import User
@@ -9,29 +10,158 @@ from utils.decorators import login_required, role_required
 # Create staff blueprint
 staff_bp = Blueprint('staff', __name__)
 
+# Page sizes for the dashboard panel endpoints
+PANEL_PAGE_SIZE = 20
+PANEL_MAX_PAGE_SIZE = 100
+
 
 @staff_bp.route('/dashboard')
 @login_required
 @role_required('staff')
 def dashboard():
-    """Display staff dashboard with pending requests and statistics.
+    """Display staff dashboard with statistics.
+    
+    Only the summary cards are rendered here; each panel fetches its
+    rows from the paginated /staff/panels/* endpoints (or /api/books)
+    when it is first shown.
     
     Returns:
         Rendered staff dashboard template.
     """
     staff = Staff.get_by_id(session['user_id'])
+    stats = staff.get_stats()
     
     return render_template(
         'pages/staff/dashboard.html',
-        pending_borrows=Borrow.get_user_borrows_by_status('pending_pickup'),
-        borrowed_books=Borrow.get_user_borrows_by_status('borrowed'),
-        overdue_books=Borrow.get_overdue_borrows(),
-        all_books=Book.get_all(),
-        all_reservations=Reservation.get_all(),
-        popular_books=Book.get_most_borrowed(limit=10),
-        stats=staff.get_stats(),
-        users_with_debt=User.get_users_with_debt()
+        stats=stats,
+        debtor_count=stats['debtors']
+    )
+
+
+def _page_args():
+    """Read the page/limit query parameters shared by the panel endpoints."""
+    page = max(1, request.args.get('page', 1, type=int))
+    limit = max(1, min(request.args.get('limit', PANEL_PAGE_SIZE, type=int),
+                       PANEL_MAX_PAGE_SIZE))
+    return page, limit
+
+
+@staff_bp.route('/panels/borrows')
+@login_required
+@role_required('staff')
+def borrows_panel():
+    """Get one page of borrows for the dashboard panels.
+    
+    Query params:
+        status: pending_pickup, borrowed or overdue.
+        q: Filter by user name.
+        sort: newest, oldest, due, pickup or user.
+        page: 1-based page number.
+        limit: Page size (default 20, max 100).
+    
+    Returns:
+        JSON response with the borrows and whether more pages follow.
+    """
+    status = request.args.get('status', 'pending_pickup')
+    if status not in ('pending_pickup', 'borrowed', 'overdue'):
+        return jsonify({'success': False, 'message': 'Invalid status'}), 400
+    page, limit = _page_args()
+    
+    borrows, has_more = Borrow.get_staff_page(
+        status,
+        request.args.get('q', '').strip(),
+        request.args.get('sort', 'newest'),
+        page,
+        limit
     )
+    Borrow.prefetch(borrows)
+    items = Borrow.to_dicts(borrows)
+    for item, borrow in zip(items, borrows):
+        user = borrow.get_user()
+        item['user_name'] = user.name if user else 'Unknown'
+    
+    return jsonify({
+        'success': True,
+        'borrows': items,
+        'page': page,
+        'has_more': has_more
+    })
+
+
+@staff_bp.route('/panels/reservations')
+@login_required
+@role_required('staff')
+def reservations_panel():
+    """Get one page of reservations for the dashboard.
+    
+    Query params:
+        status: waiting, ready, completed, expired or cancelled (optional).
+        q: Filter by user name.
+        page: 1-based page number.
+        limit: Page size (default 20, max 100).
+    
+    Returns:
+        JSON response with the reservations and whether more pages follow.
+    """
+    page, limit = _page_args()
+    reservations, has_more = Reservation.get_page(
+        request.args.get('status', ''),
+        request.args.get('q', '').strip(),
+        page,
+        limit
+    )
+    books = Book.get_by_ids(r.book_id for r in reservations)
+    users = User.get_by_ids(r.user_id for r in reservations)
+    
+    items = []
+    for reservation in reservations:
+        book = books.get(reservation.book_id)
+        user = users.get(reservation.user_id)
+        items.append({
+            'id': reservation.id,
+            'user_name': user.name if user else 'Unknown',
+            'book_title': book.title if book else 'Unknown',
+            'reservation_date': reservation.reservation_date,
+            'status': reservation.status,
+            'hold_until': reservation.hold_until,
+            # Preloaded by get_page, not counted per row
+            'queue_position': reservation.get_queue_position()
+        })
+    
+    return jsonify({
+        'success': True,
+        'reservations': items,
+        'page': page,
+        'has_more': has_more
+    })
+
+
+@staff_bp.route('/panels/debtors')
+@login_required
+@role_required('staff')
+def debtors_panel():
+    """Get one page of users with outstanding fines.
+    
+    Query params:
+        page: 1-based page number.
+        limit: Page size (default 20, max 100).
+    
+    Returns:
+        JSON response with the users, whether more pages follow, and the
+        debtor count and total debt (from the cached library totals).
+    """
+    page, limit = _page_args()
+    users, has_more = User.get_debtors_page(page, limit)
+    totals = LibraryStats.get()
+    
+    return jsonify({
+        'success': True,
+        'users': [user.to_dict() for user in users],
+        'page': page,
+        'has_more': has_more,
+        'count': totals['debtor_count'],
+        'total': totals['total_fines']
+    })
 
 
 @staff_bp.route('/approve/<borrow_id>', methods=['POST'])
@@ -22,10 +22,10 @@ def dashboard():
     
     return render_template(
         'pages/user/dashboard.html',
-        borrowed_books=Borrow.get_user_borrowed_books(user.id),
+        borrowed_books=Borrow.prefetch(Borrow.get_user_borrowed_books(user.id), users=False),
         reserved_books=Borrow.get_user_reserved_books(user.id),
-        overdue_books=Borrow.get_user_overdue_books(user.id),
-        upcoming_due=Borrow.get_upcoming_due_books(user.id, days=3)
+        overdue_books=Borrow.prefetch(Borrow.get_user_overdue_books(user.id), users=False),
+        upcoming_due=Borrow.prefetch(Borrow.get_upcoming_due_books(user.id, days=3), users=False)
     )
 
 
@@ -85,7 +85,7 @@ def borrowed_books():
         Rendered borrowed books template.
     """
     user = User.get_by_id(session['user_id'])
-    borrowed = Borrow.get_user_borrowed_books(user.id)
+    borrowed = Borrow.prefetch(Borrow.get_user_borrowed_books(user.id), users=False)
     
     return render_template(
         'pages/user/borrowed_books.html',
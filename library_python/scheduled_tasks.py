@@ -1,12 +1,14 @@
 import logging
+import time
+from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import datetime, timedelta
+from flask import g
 from models.borrow import Borrow
+from models.database import get_pool
+from models.job_run import JobRun
 from models.notification import Notification
 from models.system_log import SystemLog
-from models.database import get_db
 from models.reservation import Reservation
-from config.config import Config
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,45 +19,22 @@ def auto_cancel_expired_pickups():
     """Scheduled task: Cancel pickup requests exceeding 48-hour deadline.
     
     Runs every hour to check for expired pending_pickup borrows.
+    
+    Returns:
+        Number of pickups cancelled.
     """
-    try:
-        # 1. Get list of expired pickups BEFORE cancelling
-        expired_list = Borrow.get_expired_pickups_details(hours=Config.PENDING_PICKUP_HOURS)
-        
-        # 2. Send notifications to affected users
-        for row in expired_list:
-            user_id = row['user_id']
-            book_title = row['title']
-            
-            # Send notification
-            Notification.create(
-                user_id=user_id,
-                notification_type='alert',
-                title='Reservation Cancelled - Pickup Expired',
-                message=f'Your reservation for "{book_title}" has been automatically cancelled '
-                        f'because it was not picked up within {Config.PENDING_PICKUP_HOURS} hours. '
-                        f'You can reserve it again if needed.'
-            )
-
-        # 3. Then perform the actual cancellation
-        cancelled_count = Borrow.auto_cancel_expired_pickups()
-        
-        if cancelled_count > 0:
-            logger.info(f"Auto-cancelled {cancelled_count} expired pickup requests and notified users.")
-            SystemLog.add(
-                'Scheduled Task: Auto-cancel Expired Pickups',
-                f'Successfully cancelled {cancelled_count} expired pickup(s) and sent {cancelled_count} notification(s)',
-                'system',
-                None
-            )
-    except Exception as e:
-        logger.error(f"Error in auto_cancel_expired_pickups: {e}")
+    # Cancels, hands copies back and notifies the borrowers in bulk
+    cancelled_count = Borrow.auto_cancel_expired_pickups()
+    
+    if cancelled_count > 0:
+        logger.info(f"Auto-cancelled {cancelled_count} expired pickup requests and notified users.")
         SystemLog.add(
-            'Scheduled Task Error',
-            f'Failed to auto-cancel pickups: {str(e)}',
-            'error',
+            'Scheduled Task: Auto-cancel Expired Pickups',
+            f'Successfully cancelled {cancelled_count} expired pickup(s) and sent {cancelled_count} notification(s)',
+            'system',
             None
         )
+    return cancelled_count
 
 
 def run_auto_expire_reservations():
@@ -63,180 +42,134 @@ def run_auto_expire_reservations():
     
     This ensures that books held for users in the 'ready' state are passed 
     to the next person in queue or returned to public inventory if not claimed.
+    
+    Returns:
+        Number of reservations expired.
     """
-    try:
-        expired_count = Reservation.auto_expire_reservations()
-        
-        if expired_count > 0:
-            logger.info(f"Auto-expired {expired_count} unclaimed ready reservations.")
-            SystemLog.add(
-                'Scheduled Task: Auto-expire Reservations',
-                f'Successfully expired {expired_count} unclaimed reservation(s) and triggered cascade.',
-                'system',
-                None
-            )
-    except Exception as e:
-        logger.error(f"Error in run_auto_expire_reservations: {e}")
+    expired_count = Reservation.auto_expire_reservations()
+    
+    if expired_count > 0:
+        logger.info(f"Auto-expired {expired_count} unclaimed ready reservations.")
         SystemLog.add(
-            'Scheduled Task Error',
-            f'Failed to expire reservations: {str(e)}',
-            'error',
+            'Scheduled Task: Auto-expire Reservations',
+            f'Successfully expired {expired_count} unclaimed reservation(s) and triggered cascade.',
+            'system',
             None
         )
+    return expired_count
 
 
 def send_due_date_reminders():
     """Scheduled task: Send reminders for books due within 3 days.
     
     Runs daily at 9:00 AM to notify users about upcoming due dates.
+    
+    Returns:
+        Number of reminders sent.
     """
-    try:
-        db = get_db()
-        today = datetime.now()
-        three_days_later = (today + timedelta(days=3)).strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Find books due within 3 days
-        upcoming_due = db.execute('''
-            SELECT b.id, b.user_id, b.book_id, b.due_date, u.name as user_name, 
-                   bk.title as book_title
-            FROM borrows b
-            JOIN users u ON b.user_id = u.id
-            JOIN books bk ON b.book_id = bk.id
-            WHERE b.status = 'borrowed' AND b.due_date <= ? AND b.due_date > ?
-        ''', (three_days_later, today.strftime('%Y-%m-%d %H:%M:%S'))).fetchall()
-        
-        reminder_count = 0
-        for row in upcoming_due:
-            # Create notification
-            due_date = datetime.strptime(row['due_date'], '%Y-%m-%d %H:%M:%S')
-            days_remaining = (due_date - today).days
-            
-            message = f'Reminder: "{row["book_title"]}" is due in {days_remaining} day(s) on {due_date.strftime("%Y-%m-%d")}. Please return or renew it.'
-            
-            Notification.create(
-                user_id=row['user_id'],
-                notification_type='reminder',
-                title='Book Due Date Reminder',
-                message=message
-            )
-            reminder_count += 1
-        
-        if reminder_count > 0:
-            logger.info(f"Sent {reminder_count} due date reminder(s)")
-            SystemLog.add(
-                'Scheduled Task: Due Date Reminders',
-                f'Successfully sent {reminder_count} reminder(s)',
-                'system',
-                None
-            )
-    except Exception as e:
-        logger.error(f"Error in send_due_date_reminders: {e}")
+    reminder_count = Notification.send_due_date_reminders(days_ahead=3)
+    
+    if reminder_count > 0:
+        logger.info(f"Sent {reminder_count} due date reminder(s)")
         SystemLog.add(
-            'Scheduled Task Error',
-            f'Failed to send reminders: {str(e)}',
-            'error',
+            'Scheduled Task: Due Date Reminders',
+            f'Successfully sent {reminder_count} reminder(s)',
+            'system',
             None
         )
+    return reminder_count
 
 
 def send_overdue_notifications():
     """Scheduled task: Send notifications for overdue books.
     
     Runs daily at 10:00 AM to notify users about overdue books.
+    
+    Returns:
+        Number of notifications sent.
     """
-    try:
-        db = get_db()
-        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Find overdue books
-        overdue_borrows = db.execute('''
-            SELECT b.id, b.user_id, b.book_id, b.due_date, u.name as user_name,
-                   bk.title as book_title
-            FROM borrows b
-            JOIN users u ON b.user_id = u.id
-            JOIN books bk ON b.book_id = bk.id
-            WHERE b.status = 'borrowed' AND b.due_date < ?
-        ''', (now,)).fetchall()
-        
-        notification_count = 0
-        for row in overdue_borrows:
-            due_date = datetime.strptime(row['due_date'], '%Y-%m-%d %H:%M:%S')
-            days_overdue = (datetime.now() - due_date).days
-            
-            message = f'Overdue Alert: "{row["book_title"]}" is {days_overdue} day(s) overdue. Late fees are accumulating. Please return immediately.'
-            
-            Notification.create(
-                user_id=row['user_id'],
-                notification_type='alert',
-                title='Overdue Book Alert',
-                message=message
-            )
-            notification_count += 1
-        
-        if notification_count > 0:
-            logger.info(f"Sent {notification_count} overdue notification(s)")
-            SystemLog.add(
-                'Scheduled Task: Overdue Notifications',
-                f'Successfully sent {notification_count} notification(s)',
-                'system',
-                None
-            )
-    except Exception as e:
-        logger.error(f"Error in send_overdue_notifications: {e}")
+    notification_count = Notification.send_overdue_alerts()
+    
+    if notification_count > 0:
+        logger.info(f"Sent {notification_count} overdue notification(s)")
         SystemLog.add(
-            'Scheduled Task Error',
-            f'Failed to send overdue notifications: {str(e)}',
-            'error',
+            'Scheduled Task: Overdue Notifications',
+            f'Successfully sent {notification_count} notification(s)',
+            'system',
             None
         )
+    return notification_count
 
 
-# Initialize scheduler
-scheduler = BackgroundScheduler()
-
-# Schedule tasks
-scheduler.add_job(
-    func=auto_cancel_expired_pickups,
-    trigger='interval',
-    hours=1,
-    id='auto_cancel_expired_pickups',
-    name='Auto-cancel expired pickup requests',
-    replace_existing=True
-)
-
-scheduler.add_job(
-    func=run_auto_expire_reservations,
-    trigger='interval',
-    hours=1,
-    id='auto_expire_reservations',
-    name='Auto-expire unclaimed ready reservations',
-    replace_existing=True
-)
-
-scheduler.add_job(
-    func=send_due_date_reminders,
-    trigger='cron',
-    hour=9,
-    minute=0,
-    id='send_due_date_reminders',
-    name='Send due date reminders',
-    replace_existing=True
-)
-
-scheduler.add_job(
-    func=send_overdue_notifications,
-    trigger='cron',
-    hour=10,
-    minute=0,
-    id='send_overdue_notifications',
-    name='Send overdue notifications',
-    replace_existing=True
-)
+def run_job(app, job_id, func):
+    """Run a scheduled task with its own app context and connection.
+    
+    The task gets a connection checked out of the pool for the whole run
+    (released when the context is torn down), uncommitted work is rolled
+    back if it fails, and every run is recorded in JobRun with its
+    duration, the row count the task returned and any error.
+    
+    Args:
+        app: Flask application.
+        job_id: Scheduler job ID, used as the run history key.
+        func: Task function returning the number of rows processed.
+    """
+    started_at = datetime.now()
+    started = time.perf_counter()
+    rows_processed = 0
+    error = None
+    
+    with app.app_context():
+        g.db = get_pool().acquire()
+        try:
+            rows_processed = func() or 0
+        except Exception as e:
+            g.db.rollback()
+            error = str(e)
+            logger.error(f"Error in {job_id}: {e}")
+            SystemLog.add(
+                'Scheduled Task Error',
+                f'Job {job_id} failed: {error}',
+                'error',
+                None
+            )
+        
+        duration_ms = (time.perf_counter() - started) * 1000
+        try:
+            JobRun.record(job_id, started_at, duration_ms, rows_processed, error)
+        except Exception as e:
+            logger.error(f"Error recording run of {job_id}: {e}")
+
+
+# Initialize scheduler; a run still in progress makes the next one skip,
+# and runs missed while busy or stopped collapse into one
+scheduler = BackgroundScheduler(job_defaults={'coalesce': True, 'max_instances': 1})
+
+# (function, trigger arguments, job ID, name)
+JOBS = [
+    (auto_cancel_expired_pickups, {'trigger': 'interval', 'hours': 1},
+     'auto_cancel_expired_pickups', 'Auto-cancel expired pickup requests'),
+    (run_auto_expire_reservations, {'trigger': 'interval', 'hours': 1},
+     'auto_expire_reservations', 'Auto-expire unclaimed ready reservations'),
+    (send_due_date_reminders, {'trigger': 'cron', 'hour': 9, 'minute': 0},
+     'send_due_date_reminders', 'Send due date reminders'),
+    (send_overdue_notifications, {'trigger': 'cron', 'hour': 10, 'minute': 0},
+     'send_overdue_notifications', 'Send overdue notifications'),
+]
 
 
 def start_scheduler(app):
-    """Start the background scheduler."""
+    """Register the jobs for this app and start the background scheduler."""
     if not scheduler.running:
+        for func, trigger_args, job_id, name in JOBS:
+            scheduler.add_job(
+                func=run_job,
+                args=(app, job_id, func),
+                id=job_id,
+                name=name,
+                replace_existing=True,
+                **trigger_args
+            )
         scheduler.start()
         logger.info("Scheduled tasks started successfully")
         